@@ -11,6 +11,31 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str
     GEMINI_MODEL_PRIMARY: str = "gemini-2.0-flash"
     GEMINI_MODEL_FALLBACK: str = "gemini-2.0-flash"
+    # Comma-separated models, cheapest first; empty means primary then fallback
+    GEMINI_MODEL_CASCADE: str = ""
+    CASCADE_MIN_CONFIDENCE: float = 0.6
+    # One structured-output call for QA, bounding boxes and diagnosis per scan
+    GEMINI_COMBINED_MODE: bool = False
+    ROUTER_WINDOW_SECONDS: float = 60
+    ROUTER_MAX_ERROR_RATE: float = 0.5
+    ROUTER_MAX_P90_LATENCY: float = 20.0
+    ROUTER_MIN_SAMPLES: int = 5
+
+    # Hedged requests: duplicate a Gemini call that is slower than the rolling percentile
+    HEDGE_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 90
+    HEDGE_MIN_DELAY: float = 0.5
+    HEDGE_MAX_RATE: float = 0.1
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_WINDOW_SECONDS: float = 300
+    HEDGE_TO_FALLBACK: bool = False
+
+    # Local pre-filter (off | shadow | enforce) run before Gemini QA
+    PREFILTER_MODE: str = "off"
+    PREFILTER_BACKEND: str = "heuristic"  # heuristic | sklearn | onnx
+    PREFILTER_MODEL_PATH: Optional[str] = None
+    PREFILTER_REJECT_THRESHOLD: float = 0.9
+    PREFILTER_WORKERS: int = 2
 
     # AWS Settings (OPTIONAL for local)
     AWS_ACCESS_KEY_ID: Optional[str] = None
@@ -21,6 +46,93 @@ class Settings(BaseSettings):
 
     # Database Settings (REQUIRED locally)
     DATABASE_URL: str
+    DATABASE_ECHO: bool = True
+
+    # Serving / Cache Settings
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WEB_CONCURRENCY: int = 1
+    CACHE_BACKEND: str = "memory"  # memory | sqlite | redis
+    CACHE_SQLITE_PATH: str = "cache/cache.sqlite3"
+    CACHE_REDIS_URL: Optional[str] = None
+    CACHE_MEMORY_MAX_ENTRIES: int = 10000
+    DIAGNOSIS_CACHE_TTL: int = 86400
+    KB_CACHE_TTL: int = 3600
+
+    # Admission control for model-calling routes
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 32
+    ADMISSION_INTERACTIVE_RESERVED: int = 8
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_INTERACTIVE_MAX_WAIT: float = 30
+    ADMISSION_BULK_MAX_WAIT: float = 5
+    ADMISSION_INTERACTIVE_RATE: float = 0  # requests/second per client, 0 = unlimited
+    ADMISSION_INTERACTIVE_BURST: int = 20
+    ADMISSION_BULK_RATE: float = 5
+    ADMISSION_BULK_BURST: int = 20
+    ADMISSION_BULK_API_KEYS: str = ""  # comma-separated API keys treated as bulk
+
+    # Group commit: batch concurrent PetScan inserts into one multi-row INSERT transaction
+    SCAN_GROUP_COMMIT_ENABLED: bool = False
+    SCAN_GROUP_COMMIT_WINDOW: float = 0.005  # seconds to wait for more scans after the first
+    SCAN_GROUP_COMMIT_MAX_BATCH: int = 100
+
+    # HTTP caching (max-age in seconds, 0 = always revalidate) and response compression
+    HTTP_CACHE_SCAN_MAX_AGE: int = 300
+    HTTP_CACHE_KB_MAX_AGE: int = 60
+    HTTP_CACHE_STATS_MAX_AGE: int = 0
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # used when the optional brotli package is installed
+
+    # Request deadlines (X-Request-Timeout header, seconds) for model-calling routes
+    DEADLINE_SCAN_SECONDS: float = 60
+    DEADLINE_VISION_SECONDS: float = 30
+    DEADLINE_DIAGNOSIS_SECONDS: float = 30
+    DEADLINE_MAX_SECONDS: float = 120
+    DEADLINE_MIN_CALL_SECONDS: float = 1.0  # assumed model latency before any samples exist
+    DEADLINE_DISCONNECT_POLL: float = 0.25
+
+    # Bounding box post-processing and overlay thumbnails
+    BBOX_IOU_THRESHOLD: float = 0.5
+    BBOX_MIN_SIZE: float = 5  # on Gemini's 0-1000 scale
+    SCAN_THUMBNAIL_DIR: str = "media/thumbnails"
+    SCAN_THUMBNAIL_SIZE: int = 320
+
+    # Pregenerated diagnosis catalog
+    DIAGNOSIS_CATALOG_LANGUAGES: str = "English"  # comma-separated
+    DIAGNOSIS_CATALOG_VERSION: int = 1
+    DIAGNOSIS_CATALOG_CONCURRENCY: int = 4
+
+    # Emergency triage rules
+    TRIAGE_RELOAD_INTERVAL: float = 10  # seconds between checks for changed rules
+
+    # Knowledge base bulk import/export
+    KB_CSV_PATH: str = "knowledge_base/pet_kb.csv"
+    KB_SYNC_ON_STARTUP: bool = True
+    KB_IMPORT_BATCH_SIZE: int = 1000
+
+    # Scan history export
+    SCAN_EXPORT_BATCH_SIZE: int = 1000
+
+    # Monthly pet_scans partitions and retention (PostgreSQL)
+    SCAN_PARTITION_MONTHS_AHEAD: int = 3
+    SCAN_RETENTION_MONTHS: int = 0  # 0 keeps every partition
+    SCAN_RETENTION_ACTION: str = "detach"  # detach | drop
+    SCAN_ARCHIVE_DIR: str = "archive"
+    SCAN_ARCHIVE_S3_BUCKET: Optional[str] = None
+
+    # Idempotency-Key support for POST /pets/scan (seconds)
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_TIMEOUT: int = 300
+    IDEMPOTENCY_WAIT_TIMEOUT: int = 120
+
+    # Observability Settings
+    SERVER_TIMING_ENABLED: bool = True
+    ADMIN_TOKEN: Optional[str] = None
+    PROFILE_OUTPUT_DIR: str = "profiles"
+    PROFILE_INTERVAL: float = 0.001
 
     class Config:
         env_file = ".env"
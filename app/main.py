@@ -8,13 +8,33 @@ from app.routers.v1.vision import router as vision_router
 from app.routers.v1.recommendations import router as recommendations_router
 from app.routers.v1.stats import router as stats_router
 from app.routers.v1.diagnosis import router as diagnosis_router
+from app.routers.v1.metrics import router as metrics_router
+from app.routers.v1.admin import router as admin_router
+from app.routers.v1.triage import router as triage_router
+from app.middleware.timing import ServerTimingMiddleware
+from app.middleware.profiling import SamplingProfilerMiddleware
+from app.middleware.compression import CompressionMiddleware
 
 from app.config.settings import settings
 from app.utils.db_init import engine
+from app.utils.responses import ORJSONResponse
+from app.schemas.common import MessageResponse
 from app.models.pet_scan import Base
 # Import models to register them with Base.metadata
 from app.models.pet_kb import PetKB 
 from app.models.pet import Pet
+from app.models.idempotency import IdempotencyKey
+from app.models.app_meta import AppMeta
+from app.models.diagnosis_catalog import DiagnosisCatalog
+from app.models.triage_rule import TriageRule
+from app.services import metrics
+from app.services.prefilter import prefilter_service
+from app.services.cache import cache
+from app.services.idempotency import idempotency_service
+from app.services.knowledge import kb_service
+from app.services.partitions import ensure_partitions
+from app.services.triage import triage_engine
+from app.services.scan_writer import scan_writer
 import logging
 
 # Configure logging
@@ -27,8 +47,16 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0.0",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
 )
 
+# Middleware (the last one added runs first)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+app.add_middleware(SamplingProfilerMiddleware)
+if settings.SERVER_TIMING_ENABLED:
+    app.add_middleware(ServerTimingMiddleware)
+
 # Startup event to create tables
 @app.on_event("startup")
 async def startup():
@@ -36,8 +64,27 @@ async def startup():
         # Create tables if they don't exist
         await conn.run_sync(Base.metadata.create_all)
     logging.info("Database tables created/verified.")
+    if settings.KB_SYNC_ON_STARTUP:
+        await kb_service.sync_bundled_csv()
+    await triage_engine.seed_defaults()
+    try:
+        await ensure_partitions()
+    except Exception as e:
+        # Another worker may be creating the same partitions
+        logging.warning(f"Scan partition maintenance skipped: {e}")
+    purged = await idempotency_service.purge_expired()
+    if purged:
+        logging.info(f"Purged {purged} expired idempotency keys.")
+
+@app.on_event("shutdown")
+async def shutdown():
+    await scan_writer.close()
+    prefilter_service.shutdown()
+    await cache.close()
+    metrics.mark_process_dead()
 
 # Include Routers
+app.include_router(metrics_router)
 app.include_router(health_router, prefix=settings.API_V1_STR)
 app.include_router(kb_router, prefix=settings.API_V1_STR)
 app.include_router(scans_router, prefix=settings.API_V1_STR)
@@ -46,10 +93,12 @@ app.include_router(recommendations_router, prefix=settings.API_V1_STR)
 app.include_router(stats_router, prefix=settings.API_V1_STR)
 app.include_router(diagnosis_router, prefix=settings.API_V1_STR)
 app.include_router(pets_entity_router, prefix=settings.API_V1_STR)
+app.include_router(admin_router, prefix=settings.API_V1_STR)
+app.include_router(triage_router, prefix=settings.API_V1_STR)
 # Existing scan router
 app.include_router(pets.router, prefix=f"{settings.API_V1_STR}/pets", tags=["Scan"])
 
-@app.get("/")
+@app.get("/", response_model=MessageResponse)
 async def root():
     return {"message": "Welcome to Pet Disease Detection Service API"}
 
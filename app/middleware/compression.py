@@ -0,0 +1,139 @@
+import importlib.util
+import zlib
+
+from app.config.settings import settings
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/xml", "application/javascript")
+
+
+def brotli_available() -> bool:
+    return importlib.util.find_spec("brotli") is not None
+
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON, NDJSON and CSV responses of at least COMPRESSION_MIN_SIZE bytes
+    with brotli (if the `brotli` package is installed and accepted) or gzip.
+    Streaming responses are compressed chunk by chunk and flushed, so exports
+    still reach the client progressively. The ETag of a compressed body gets a
+    "-br"/"-gzip" suffix, since it is a different representation.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.brotli = brotli_available()
+
+    def _choose(self, scope):
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1").lower()
+        offered = {token.split(";")[0].strip() for token in accept.split(",")}
+        if self.brotli and "br" in offered:
+            return _BrotliEncoder
+        if "gzip" in offered:
+            return _GzipEncoder
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoder_class = self._choose(scope)
+        if encoder_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 304)
+                    or b"content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                # Small complete bodies aren't worth it
+                if not more_body and len(body) < settings.COMPRESSION_MIN_SIZE:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = encoder_class()
+                await send({**start_message, "headers": self._headers(start_message, encoder.name)})
+
+            data = encoder.compress(body) if more_body else encoder.finish(body)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _headers(start_message, encoding: str):
+        headers = []
+        vary = None
+        for name, value in start_message.get("headers", []):
+            lower = name.lower()
+            if lower == b"content-length":
+                continue
+            if lower == b"etag" and value.endswith(b'"'):
+                value = value[:-1] + f'-{encoding}"'.encode()
+            if lower == b"vary":
+                vary = value
+                continue
+            headers.append((name, value))
+        if vary is None:
+            vary = b"Accept-Encoding"
+        elif b"accept-encoding" not in vary.lower():
+            vary = vary + b", Accept-Encoding"
+        headers.append((b"vary", vary))
+        headers.append((b"content-encoding", encoding.encode()))
+        return headers
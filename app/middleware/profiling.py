@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProfilingConfig:
+    route_prefix: str
+    sample_rate: float
+    expires_at: float
+
+
+class ProfilerState:
+    """
+    Per-process switch for the sampling profiler, toggled through the admin API.
+    In multi-worker mode each worker keeps its own switch.
+    """
+
+    def __init__(self):
+        self.config: Optional[ProfilingConfig] = None
+
+    def enable(self, route_prefix: str, sample_rate: float, duration_seconds: int) -> ProfilingConfig:
+        self.config = ProfilingConfig(
+            route_prefix=route_prefix,
+            sample_rate=sample_rate,
+            expires_at=time.time() + duration_seconds,
+        )
+        return self.config
+
+    def disable(self) -> None:
+        self.config = None
+
+    def should_profile(self, path: str) -> bool:
+        config = self.config
+        if config is None:
+            return False
+        if time.time() > config.expires_at:
+            self.config = None
+            return False
+        return path.startswith(config.route_prefix) and random.random() < config.sample_rate
+
+
+profiler_state = ProfilerState()
+
+
+class SamplingProfilerMiddleware:
+    """
+    Runs pyinstrument for a sampled fraction of requests on the configured route
+    and stores speedscope flame graphs in PROFILE_OUTPUT_DIR.
+    When profiling is off the cost is a single attribute check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or profiler_state.config is None:
+            await self.app(scope, receive, send)
+            return
+        if not profiler_state.should_profile(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+
+        profiler = Profiler(interval=settings.PROFILE_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            output = profiler.output(renderer=SpeedscopeRenderer())
+            slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+            filename = f"{int(time.time() * 1000)}_{scope['method'].lower()}_{slug}.speedscope.json"
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _write_profile, filename, output)
+
+
+def _write_profile(filename: str, output: str) -> None:
+    os.makedirs(settings.PROFILE_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILE_OUTPUT_DIR, filename)
+    with open(path, "w") as f:
+        f.write(output)
+    logger.info(f"Profile written to {path}")
@@ -0,0 +1,32 @@
+import time
+
+from app.services import timing
+
+
+class ServerTimingMiddleware:
+    """
+    Collects named spans for each HTTP request (Gemini calls, executor queue wait,
+    JSON parsing, DB queries) and returns them in a `Server-Timing` header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans = timing.start_request()
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = timing.server_timing_header(spans, total=time.perf_counter() - start)
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Text, DateTime
+from app.models.pet_scan import Base
+from datetime import datetime
+
+
+class AppMeta(Base):
+    """Small key/value store for bookkeeping such as the checksum of the last synced KB CSV."""
+    __tablename__ = "app_meta"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
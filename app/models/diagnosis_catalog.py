@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, UniqueConstraint
+from app.models.pet_scan import Base
+from datetime import datetime
+
+
+class DiagnosisCatalog(Base):
+    """
+    Pregenerated full diagnosis per KB (pet_name, disease_name) pair and language.
+    Rows are never updated; regenerating with a new prompt writes a new `version`.
+    """
+    __tablename__ = "diagnosis_catalog"
+    __table_args__ = (
+        UniqueConstraint("pet_name", "disease_name", "lang", "version", name="uq_diagnosis_catalog_entry"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    pet_name = Column(Text, nullable=False)  # exactly as in pet_kb
+    disease_name = Column(Text, nullable=False)
+    lang = Column(String, nullable=False)  # lower-case language name
+    version = Column(Integer, nullable=False)
+    diagnosis = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
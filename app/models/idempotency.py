@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, JSON, DateTime
+from app.models.pet_scan import Base
+from datetime import datetime
+
+
+class IdempotencyKey(Base):
+    """
+    Outcome of a POST /pets/scan request submitted with an Idempotency-Key header.
+    `expires_at` is the lock timeout while the request is in progress and the
+    replay TTL once it has completed.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # sha256 of the request payload
+    status = Column(String, nullable=False, default="in_progress")  # in_progress, completed
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
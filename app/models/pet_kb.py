@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Text
+from sqlalchemy import Column, Index, Integer, Text
 from app.models.pet_scan import Base
 
 class PetKB(Base):
@@ -10,8 +10,10 @@ class PetKB(Base):
         disease_name TEXT NOT NULL, 
         treatment TEXT NOT NULL
     );
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_pet_kb_pet_disease ON pet_kb (pet_name, disease_name);
     """
     __tablename__ = "pet_kb"
+    __table_args__ = (Index("uq_pet_kb_pet_disease", "pet_name", "disease_name", unique=True),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     pet_name = Column(Text, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, JSON, DateTime
+from sqlalchemy import Column, String, Boolean, JSON, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
 import uuid
@@ -7,9 +7,12 @@ Base = declarative_base()
 
 class PetScan(Base):
     __tablename__ = "pet_scans"
+    __table_args__ = (Index("ix_pet_scans_pet_id_created_at", "pet_id", "created_at"),)
 
     id = Column(String, primary_key=True, default=lambda: f"petscan_{uuid.uuid4().hex[:8]}")
     is_valid_pet = Column(Boolean, default=False)
     is_healthy = Column(Boolean, default=True)
     result = Column(JSON, nullable=True) # Combined QA and BBOX results
+    result_hash = Column(String, nullable=True) # ETag of the result, see http_cache.content_hash
     created_at = Column(DateTime, default=datetime.utcnow)
+    pet_id = Column(String, ForeignKey("pets.id", ondelete="SET NULL"), nullable=True)
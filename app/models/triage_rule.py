@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, JSON, Boolean, DateTime
+from app.models.pet_scan import Base
+from datetime import datetime
+
+
+class TriageRule(Base):
+    """
+    Emergency triage rule. A rule applies when any keyword (or synonym) occurs in the
+    disease name or symptoms, the severity is one of `severities` and the pet type is
+    one of `pet_types`; an empty list matches anything. The most urgent matching rule
+    wins, then the highest priority.
+    """
+    __tablename__ = "triage_rules"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False)
+    keywords = Column(JSON, nullable=False, default=list)
+    severities = Column(JSON, nullable=False, default=list)
+    pet_types = Column(JSON, nullable=False, default=list)
+    urgency = Column(String, nullable=False)  # emergency, urgent, routine
+    priority = Column(Integer, nullable=False, default=0)
+    reason = Column(Text, nullable=False)  # may contain {disease_name}
+    next_steps = Column(JSON, nullable=False, default=list)
+    enabled = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
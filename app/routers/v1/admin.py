@@ -0,0 +1,103 @@
+import os
+import secrets
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from pydantic import BaseModel, Field
+
+from app.config.settings import settings
+from app.middleware.profiling import profiler_state
+from app.services.hedging import hedge_policy
+from app.services.routing import model_router
+from app.schemas.common import MessageResponse
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only when X-Admin-Token matches ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(
+        x_admin_token, settings.ADMIN_TOKEN
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+class ProfilingRequest(BaseModel):
+    route_prefix: str = Field(..., examples=["/api/v1/pets/scan"])
+    sample_rate: float = Field(0.05, gt=0, le=1)
+    duration_seconds: int = Field(300, ge=1, le=86400)
+
+
+class ProfilingConfigResponse(BaseModel):
+    route_prefix: str
+    sample_rate: float
+    expires_at: float
+
+
+class ProfilingStatus(BaseModel):
+    config: Optional[ProfilingConfigResponse] = None
+    profiles: List[str]
+
+
+class ProfilingEnabled(MessageResponse):
+    config: ProfilingConfigResponse
+
+
+class ModelStats(BaseModel):
+    model: str
+    samples: int
+    error_rate: float
+    p90_latency: Optional[float] = None
+    degraded: bool
+
+
+class HedgeStats(BaseModel):
+    samples: int
+    hedge_delay: Optional[float] = None
+
+
+class HedgingStatus(BaseModel):
+    enabled: bool
+    prompt_types: Dict[str, HedgeStats]
+
+
+class ModelHealth(BaseModel):
+    routing_order: List[str]
+    models: List[ModelStats]
+    hedging: HedgingStatus
+
+
+@router.get("/profiling", response_model=ProfilingStatus, dependencies=[Depends(require_admin)])
+async def get_profiling():
+    """Show the profiler switch and the stored flame graphs."""
+    files = []
+    if os.path.isdir(settings.PROFILE_OUTPUT_DIR):
+        files = sorted(os.listdir(settings.PROFILE_OUTPUT_DIR), reverse=True)
+    return {"config": profiler_state.config, "profiles": files}
+
+
+@router.post("/profiling", response_model=ProfilingEnabled, dependencies=[Depends(require_admin)])
+async def enable_profiling(req: ProfilingRequest):
+    """Profile a fraction of the requests on a route for a limited time."""
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        raise HTTPException(status_code=501, detail="pyinstrument is not installed.")
+    config = profiler_state.enable(req.route_prefix, req.sample_rate, req.duration_seconds)
+    return {"message": "Profiling enabled", "config": config}
+
+
+@router.delete("/profiling", response_model=MessageResponse, dependencies=[Depends(require_admin)])
+async def disable_profiling():
+    profiler_state.disable()
+    return {"message": "Profiling disabled"}
+
+
+@router.get("/models", response_model=ModelHealth, dependencies=[Depends(require_admin)])
+async def get_model_health():
+    """Rolling latency and error rate of each model in the cascade, plus hedge delays."""
+    return {
+        "routing_order": model_router.tiers(),
+        "models": model_router.snapshot(),
+        "hedging": {"enabled": hedge_policy.enabled, "prompt_types": hedge_policy.snapshot()},
+    }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import logging
@@ -6,19 +6,35 @@ import logging
 from app.utils.db_init import get_db
 from app.models.pet_scan import PetScan
 from app.models.pet_kb import PetKB
+from app.schemas.scans import CombinedDiagnosis, ScanResult
 from app.services.gemini import gemini_service
+from app.services.admission import admit
+from app.services import deadline
+from app.config.settings import settings
+from app.services import diagnosis_catalog
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/scans", tags=["Scans"])
 
-@router.get("/{scan_id}/diagnosis")
-async def get_combined_diagnosis(scan_id: str, db: AsyncSession = Depends(get_db)):
+@router.get(
+    "/{scan_id}/diagnosis",
+    response_model=CombinedDiagnosis,
+    dependencies=[
+        Depends(deadline.request_deadline(settings.DEADLINE_DIAGNOSIS_SECONDS), scope="function"),
+        Depends(admit),
+    ],
+)
+async def get_combined_diagnosis(
+    scan_id: str,
+    lang: str = Query("English", description="Language of the full diagnosis"),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Combined diagnosis endpoint:
     1. Fetches scan data
     2. Fetches KB treatment
-    3. Fetches AI diagnosis
+    3. Fetches AI diagnosis (pregenerated catalog first, live Gemini otherwise)
     Returns all in one response.
     """
     # 1) Get Scan Data
@@ -29,14 +45,15 @@ async def get_combined_diagnosis(scan_id: str, db: AsyncSession = Depends(get_db
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    res_data = scan.result or {}
-    qa = res_data.get("qa", {})
+    scan_result = ScanResult.from_stored(scan.result)
+    qa = scan_result.qa
     
-    pet_name = qa.get("detected_pet", "Pet")
-    disease_name = qa.get("suspected_condition", "None") or "None"
+    pet_name = qa.detected_pet or "Pet"
+    disease_name = qa.suspected_condition or "None"
     
     # 2) Fetch KB Treatment
     kb_treatment = "No specific treatment found in knowledge base."
+    kb_entry = None
     if disease_name != "None":
         kb_query = select(PetKB).where(
             PetKB.pet_name.ilike(f"%{pet_name}%"),
@@ -49,6 +66,7 @@ async def get_combined_diagnosis(scan_id: str, db: AsyncSession = Depends(get_db
             
     # 3) Fetch AI Full Diagnosis (Gemini)
     ai_status = "ok"
+    source = None
     full_diag = {
         "disease_overview": "",
         "common_symptoms": [],
@@ -58,9 +76,22 @@ async def get_combined_diagnosis(scan_id: str, db: AsyncSession = Depends(get_db
         "disclaimer": ""
     }
     
-    if disease_name != "None":
+    # Combined-mode scans already carry the full (English) diagnosis
+    use_stored = scan_result.diagnosis is not None and lang.lower() == "english"
+    catalog_diag = None
+    if kb_entry and not use_stored:
+        catalog_diag = await diagnosis_catalog.lookup(db, kb_entry.pet_name, kb_entry.disease_name, lang)
+
+    if use_stored:
+        full_diag = scan_result.diagnosis.model_dump()
+        source = "scan"
+    elif catalog_diag:
+        full_diag = catalog_diag.model_dump()
+        source = "catalog"
+    elif disease_name != "None":
         try:
-            full_diag = await gemini_service.get_full_diagnosis(pet_name, disease_name)
+            full_diag = (await gemini_service.get_full_diagnosis(pet_name, disease_name, lang)).model_dump()
+            source = "live"
         except Exception as e:
             logger.error(f"Gemini diagnosis failed for scan {scan_id}: {e}")
             ai_status = "failed"
@@ -77,11 +108,12 @@ async def get_combined_diagnosis(scan_id: str, db: AsyncSession = Depends(get_db
         "summary": {
             "scan_id": scan.id,
             "is_healthy": scan.is_healthy,
-            "severity": qa.get("severity") or (None if scan.is_healthy else "unknown")
+            "severity": qa.severity or (None if scan.is_healthy else "unknown")
         },
         "kb": {
             "treatment": kb_treatment
         },
         "full_diagnosis": full_diag,
+        "diagnosis_source": source,
         "ai_status": ai_status
     }
@@ -1,7 +1,11 @@
 from fastapi import APIRouter
+from pydantic import BaseModel
 
 router = APIRouter(tags=["Health"])
 
-@router.get("/health")
+class HealthResponse(BaseModel):
+    status: str
+
+@router.get("/health", response_model=HealthResponse)
 async def health_check():
     return {"status": "ok"}
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, distinct, delete
+from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
+import csv
+import io
 
+from app.config.settings import settings
 from app.utils.db_init import get_db
 from app.models.pet_kb import PetKB
+from app.schemas.common import MessageResponse
+from app.services.cache import bump_version, get_or_set_json, get_version
+from app.services.knowledge import detect_format, kb_service
+from app.services import http_cache
 
 router = APIRouter(prefix="/kb", tags=["Knowledge Base"])
 
@@ -14,61 +23,130 @@ class KBEntryCreate(BaseModel):
     disease_name: str
     treatment: str
 
-@router.get("/")
+class KBEntry(KBEntryCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class KBImportResult(BaseModel):
+    received: int
+    written: int
+    invalid: int
+
+def _kb_row(item: PetKB) -> dict:
+    return {
+        "id": item.id,
+        "pet_name": item.pet_name,
+        "disease_name": item.disease_name,
+        "treatment": item.treatment,
+    }
+
+async def _cached(key: str, load):
+    """KB reads are cached per KB version, which every write bumps."""
+    version = await get_version("kb")
+    return await get_or_set_json("kb", f"v{version}:{key}", load, ttl=settings.KB_CACHE_TTL)
+
+async def kb_validators(request: Request, response: Response):
+    """ETag from the KB version; answers 304 before anything is read."""
+    etag = await http_cache.version_etag("kb")
+    http_cache.conditional(request, response, etag, http_cache.policy(settings.HTTP_CACHE_KB_MAX_AGE))
+
+@router.get("/", response_model=List[KBEntry], dependencies=[Depends(kb_validators)])
 async def get_kb(
     pet_name: Optional[str] = Query(None),
     disease_name: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(PetKB)
-    if pet_name:
-        query = query.where(PetKB.pet_name.ilike(f"%{pet_name}%"))
-    if disease_name:
-        query = query.where(PetKB.disease_name.ilike(f"%{disease_name}%"))
-    
-    result = await db.execute(query)
-    items = result.scalars().all()
-    return items
+    async def load():
+        query = select(PetKB)
+        if pet_name:
+            query = query.where(PetKB.pet_name.ilike(f"%{pet_name}%"))
+        if disease_name:
+            query = query.where(PetKB.disease_name.ilike(f"%{disease_name}%"))
+
+        result = await db.execute(query)
+        return [_kb_row(item) for item in result.scalars().all()]
+
+    return await _cached(f"list:{pet_name}:{disease_name}", load)
 
-@router.get("/treatment")
+@router.get("/treatment", response_model=KBEntry, dependencies=[Depends(kb_validators)])
 async def get_treatment(
     pet_name: str = Query(...),
     disease_name: str = Query(...),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(PetKB).where(
-        PetKB.pet_name.ilike(pet_name),
-        PetKB.disease_name.ilike(disease_name)
-    )
-    result = await db.execute(query)
-    item = result.scalars().first()
+    async def load():
+        query = select(PetKB).where(
+            PetKB.pet_name.ilike(pet_name),
+            PetKB.disease_name.ilike(disease_name)
+        )
+        result = await db.execute(query)
+        item = result.scalars().first()
+        return _kb_row(item) if item else None
+
+    item = await _cached(f"treatment:{pet_name.lower()}:{disease_name.lower()}", load)
     if not item:
         raise HTTPException(status_code=404, detail="Treatment not found in KB")
     return item
 
-@router.get("/diseases")
+@router.get("/diseases", response_model=List[str], dependencies=[Depends(kb_validators)])
 async def get_kb_diseases(
     pet_name: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_db)
 ):
     """List distinct diseases in the KB."""
-    query = select(distinct(PetKB.disease_name))
-    if pet_name:
-        query = query.where(PetKB.pet_name.ilike(f"%{pet_name}%"))
-    
-    result = await db.execute(query)
-    return result.scalars().all()
+    async def load():
+        query = select(distinct(PetKB.disease_name))
+        if pet_name:
+            query = query.where(PetKB.pet_name.ilike(f"%{pet_name}%"))
+
+        result = await db.execute(query)
+        return list(result.scalars().all())
 
-@router.post("/", status_code=201)
+    return await _cached(f"diseases:{pet_name}", load)
+
+@router.post("/import", response_model=KBImportResult)
+async def import_kb(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl"]] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upsert a CSV or JSONL file of pet_name, disease_name, treatment rows."""
+    fmt = detect_format(file.filename, format)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return await kb_service.import_stream(db, stream, fmt)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse {fmt} upload: {e}")
+    finally:
+        stream.detach()
+
+@router.get("/export", dependencies=[Depends(kb_validators)])
+async def export_kb(response: Response, format: Literal["csv", "jsonl"] = Query("csv")):
+    """Stream the whole KB as CSV or JSONL."""
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        kb_service.export(format),
+        media_type=media_type,
+        # Keep the validators set by kb_validators
+        headers={**response.headers, "Content-Disposition": f"attachment; filename=pet_kb.{format}"},
+    )
+
+@router.post("/", response_model=KBEntry, status_code=201)
 async def create_kb_entry(entry: KBEntryCreate, db: AsyncSession = Depends(get_db)):
     """Add a new entry to the Knowledge Base."""
     new_entry = PetKB(**entry.dict())
     db.add(new_entry)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="KB entry for this pet and disease already exists")
     await db.refresh(new_entry)
+    await bump_version("kb")
     return new_entry
 
-@router.put("/{id}")
+@router.put("/{id}", response_model=KBEntry)
 async def update_kb_entry(id: int, entry: KBEntryCreate, db: AsyncSession = Depends(get_db)):
     """Update an existing KB entry."""
     result = await db.execute(select(PetKB).where(PetKB.id == id))
@@ -80,10 +158,14 @@ async def update_kb_entry(id: int, entry: KBEntryCreate, db: AsyncSession = Depe
     item.disease_name = entry.disease_name
     item.treatment = entry.treatment
     
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="KB entry for this pet and disease already exists")
+    await bump_version("kb")
     return item
 
-@router.delete("/{id}")
+@router.delete("/{id}", response_model=MessageResponse)
 async def delete_kb_entry(id: int, db: AsyncSession = Depends(get_db)):
     """Delete a KB entry."""
     result = await db.execute(select(PetKB).where(PetKB.id == id))
@@ -93,4 +175,5 @@ async def delete_kb_entry(id: int, db: AsyncSession = Depends(get_db)):
     
     await db.delete(item)
     await db.commit()
+    await bump_version("kb")
     return {"message": "KB entry deleted"}
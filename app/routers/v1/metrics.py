@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+
+from app.services import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    data, content_type = metrics.render_latest()
+    return Response(content=data, media_type=content_type)
@@ -1,73 +1,193 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Header, Response
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import asyncio
 import uuid
 import logging
 
+from app.config.settings import settings
 from app.services.gemini import gemini_service
+from app.services import metrics
+from app.services import bbox, http_cache
+from app.services.prefilter import prefilter_service
+from app.services.admission import admit
+from app.services import deadline
+from app.services.triage import triage_engine
+from app.services.scan_writer import scan_writer
+from app.services.idempotency import IdempotencyError, fingerprint, idempotency_service
 from app.utils.db_init import get_db
 from app.models.pet_scan import PetScan
+from app.models.pet import Pet
+from app.schemas.pets import PetScanResponse
+from app.schemas.scans import ScanResult
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/scan")
+@router.post(
+    "/scan",
+    response_model=PetScanResponse,
+    response_model_exclude_none=True,
+    dependencies=[
+        Depends(deadline.request_deadline(settings.DEADLINE_SCAN_SECONDS), scope="function"),
+        Depends(admit),
+    ],
+)
 async def scan_pet(
+    response: Response,
     image: UploadFile = File(...),
     pet_name: str = Form("Unknown"),
+    pet_id: Optional[str] = Form(None, description="Pet profile this scan belongs to"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db),
 ):
     logger.info(f"--- Scan Start: pet_name={pet_name} ---")
     
     # 1) Read image bytes
-    image_bytes = await image.read()
+    with metrics.scan_stage("upload_read"):
+        image_bytes = await image.read()
     if not image_bytes:
         logger.error("Scan failed: Empty image uploaded")
         raise HTTPException(status_code=400, detail="Empty image file uploaded.")
 
+    if pet_id:
+        pet = await db.get(Pet, pet_id)
+        if not pet:
+            raise HTTPException(status_code=404, detail="Pet not found")
+        if pet_name == "Unknown":
+            pet_name = pet.pet_type
+
+    # Retries with the same Idempotency-Key wait for the first attempt and replay its response
+    claim = None
+    if idempotency_key:
+        try:
+            claim = await idempotency_service.begin(
+                idempotency_key, fingerprint(image_bytes, pet_name.encode(), (pet_id or "").encode())
+            )
+        except IdempotencyError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        if claim.response is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            response.status_code = claim.status_code
+            return claim.response
+
+    try:
+        result = await _run_scan(image_bytes, image.content_type or "image/jpeg", pet_name, pet_id, db)
+    except BaseException:
+        if claim is not None:
+            await idempotency_service.release(claim)
+        raise
+    if claim is not None:
+        result = jsonable_encoder(result)
+        with deadline.critical():
+            await idempotency_service.complete(claim, result)
+    return result
+
+
+async def _run_scan(image_bytes: bytes, content_type: str, pet_name: str, pet_id: Optional[str], db: AsyncSession):
     try:
-        # 2) Run QA Analysis
-        content_type = image.content_type or "image/jpeg"
-        logger.info(f"Calling Gemini QA for {pet_name} (type: {content_type})...")
-        qa_result = await gemini_service.run_qa_analysis(image_bytes, pet_type=pet_name, mime_type=content_type)
+        # 2) Local pre-filter: skip Gemini for confident non-pet images
+        prefilter = await prefilter_service.screen(image_bytes)
+        if prefilter.rejected:
+            logger.warning("Detection rejected by local prefilter")
+            return {
+                "is_valid_pet": False,
+                "message": "The image is not a valid pet image. Please upload a clear pet image.",
+                "qa_details": prefilter.rejection,
+            }
+
+        # 3) Run QA Analysis (or QA + boxes + diagnosis in one call in combined mode)
+        scan_result = None
+        if settings.GEMINI_COMBINED_MODE:
+            logger.info(f"Calling Gemini combined analysis for {pet_name} (type: {content_type})...")
+            with metrics.scan_stage("combined"):
+                combined = await gemini_service.run_combined_analysis(
+                    image_bytes, pet_type=pet_name, mime_type=content_type
+                )
+            scan_result = gemini_service.split_combined(combined)
+            qa_result = scan_result.qa
+        else:
+            logger.info(f"Calling Gemini QA for {pet_name} (type: {content_type})...")
+            with metrics.scan_stage("qa"):
+                qa_result = await gemini_service.run_qa_analysis(image_bytes, pet_type=pet_name, mime_type=content_type)
         logger.info(f"QA Result: {qa_result}")
+        prefilter.observe(qa_result.is_valid_pet)
 
-        # 3) Not a valid pet
-        if not qa_result.get("is_valid_pet", False):
-            logger.warning(f"Detection rejected: {qa_result.get('detected_pet', 'Unknown')}")
+        # 4) Not a valid pet
+        if not qa_result.is_valid_pet:
+            logger.warning(f"Detection rejected: {qa_result.detected_pet}")
             return {
                 "is_valid_pet": False,
                 "message": "The image is not a valid pet image. Please upload a clear pet image.",
-                "qa_details": qa_result,
+                "qa_details": qa_result.model_dump(),
             }
 
-        # 4) Generate Bounding Boxes
-        logger.info("Generating bounding boxes...")
-        bbox_result = await gemini_service.generate_bounding_boxes(image_bytes, mime_type=content_type)
-        logger.info(f"BBOX Result: {bbox_result}")
+        # 5) Generate Bounding Boxes (already done in combined mode) while the thumbnail is made,
+        #    then clean the boxes and convert them to pixels
+        thumbnail_task = asyncio.create_task(asyncio.to_thread(bbox.make_thumbnail, image_bytes))
+        try:
+            if scan_result is None:
+                logger.info("Generating bounding boxes...")
+                with metrics.scan_stage("bbox"):
+                    bbox_result = await gemini_service.generate_bounding_boxes(image_bytes, mime_type=content_type)
+                logger.info(f"BBOX Result: {bbox_result}")
 
-        # 5) Combine result
-        combined_result = {
-            "qa": qa_result,
-            "bboxes": bbox_result.get("detections", []),
-        }
+                scan_result = ScanResult(qa=qa_result.model_dump())
+                detections = bbox_result.detections
+            else:
+                detections = scan_result.bboxes
+            image_size, thumbnail = await thumbnail_task
+        finally:
+            # The bbox call failed or the route was cancelled: don't leave the thumbnail task dangling
+            if not thumbnail_task.done():
+                thumbnail_task.cancel()
+            elif not thumbnail_task.cancelled():
+                thumbnail_task.exception()
+        scan_result.bboxes = bbox.postprocess(detections, image_size)
+        scan_result.image_size = list(image_size) if image_size else None
 
-        # 6) Save to PostgreSQL
+        # 6) Triage the detected condition against the emergency rules
+        scan_result.triage = await triage_engine.evaluate(
+            disease_name=qa_result.suspected_condition or "",
+            symptoms=scan_result.diagnosis.common_symptoms if scan_result.diagnosis else [],
+            severity=qa_result.severity,
+            pet_type=qa_result.detected_pet,
+        )
+        combined_result = scan_result.model_dump(exclude_none=True)
+
+        # 7) Save to PostgreSQL, unless nobody is waiting for the result anymore
+        deadline.check()
         scan_id = f"petscan_{uuid.uuid4().hex[:8]}"
         new_scan = PetScan(
             id=scan_id,
             is_valid_pet=True,
-            is_healthy=qa_result.get("is_healthy", True),
+            is_healthy=qa_result.is_healthy,
             result=combined_result,
+            result_hash=http_cache.content_hash(combined_result),
+            pet_id=pet_id,
         )
 
         logger.info(f"Saving scan {scan_id} to database...")
-        db.add(new_scan)
-        await db.commit()
-        await db.refresh(new_scan)
-        logger.info(f"Scan {scan_id} saved successfully.")
+        with metrics.scan_stage("db_commit"), deadline.critical():
+            if settings.SCAN_GROUP_COMMIT_ENABLED:
+                await scan_writer.write(new_scan)
+            else:
+                # The id is generated here, so there is nothing to refresh after the commit
+                await deadline.limit_statements(db)
+                db.add(new_scan)
+                await db.commit()
+            logger.info(f"Scan {scan_id} saved successfully.")
+
+        # The scan is saved; without a thumbnail the overlay route just has nothing to draw on
+        if thumbnail:
+            try:
+                await asyncio.to_thread(bbox.save_thumbnail, scan_id, thumbnail)
+            except Exception as e:
+                logger.warning(f"Could not save thumbnail of scan {scan_id}: {e}")
 
-        # 7) Return response
+        # 8) Return response
         return {
             "scan_id": scan_id,
             "is_valid_pet": True,
@@ -76,6 +196,8 @@ async def scan_pet(
             "message": "Scan completed successfully.",
         }
 
+    except (deadline.DeadlineExceeded, deadline.ClientDisconnected):
+        raise
     except ValueError as ve:
         logger.error(f"Configuration error: {ve}")
         # Custom handling for missing API key
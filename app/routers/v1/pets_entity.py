@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_
+from datetime import datetime
 from typing import List, Optional
+import base64
+import binascii
 import uuid
 
 from app.utils.db_init import get_db
 from app.models.pet import Pet
+from app.models.pet_scan import PetScan
 
 router = APIRouter(prefix="/pets", tags=["Pets (Entities)"])
 
@@ -22,6 +26,33 @@ class PetResponse(PetCreate):
     class Config:
         from_attributes = True
 
+class PetListItem(PetResponse):
+    scan_count: int = 0
+    last_scan_at: Optional[datetime] = None
+
+class PetScanSummary(BaseModel):
+    id: str
+    created_at: datetime
+    is_valid_pet: bool
+    is_healthy: bool
+    detected_pet: Optional[str] = None
+    suspected_condition: Optional[str] = None
+    severity: Optional[str] = None
+
+class PetScanPage(BaseModel):
+    items: List[PetScanSummary]
+    next_cursor: Optional[str] = None
+
+def _encode_cursor(created_at: datetime, scan_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{scan_id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, scan_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), scan_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.post("/", response_model=PetResponse)
 async def create_pet(pet_data: PetCreate, db: AsyncSession = Depends(get_db)):
     """Create a new pet profile."""
@@ -36,11 +67,31 @@ async def create_pet(pet_data: PetCreate, db: AsyncSession = Depends(get_db)):
     await db.refresh(new_pet)
     return new_pet
 
-@router.get("/", response_model=List[PetResponse])
-async def list_pets(db: AsyncSession = Depends(get_db)):
-    """List all pets."""
-    result = await db.execute(select(Pet).order_by(Pet.created_at.desc()))
-    return result.scalars().all()
+@router.get("/", response_model=List[PetListItem])
+async def list_pets(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """List pets with their scan count and latest scan time, in one query."""
+    page = select(Pet).order_by(Pet.created_at.desc(), Pet.id).offset(offset).limit(limit).subquery()
+    counts = (
+        select(
+            PetScan.pet_id,
+            func.count().label("scan_count"),
+            func.max(PetScan.created_at).label("last_scan_at"),
+        )
+        .where(PetScan.pet_id.in_(select(page.c.id)))
+        .group_by(PetScan.pet_id)
+        .subquery()
+    )
+    query = (
+        select(page, func.coalesce(counts.c.scan_count, 0).label("scan_count"), counts.c.last_scan_at)
+        .outerjoin(counts, counts.c.pet_id == page.c.id)
+        .order_by(page.c.created_at.desc(), page.c.id)
+    )
+    result = await db.execute(query)
+    return [PetListItem.model_validate(dict(row)) for row in result.mappings()]
 
 @router.get("/{pet_id}", response_model=PetResponse)
 async def get_pet(pet_id: str, db: AsyncSession = Depends(get_db)):
@@ -50,3 +101,37 @@ async def get_pet(pet_id: str, db: AsyncSession = Depends(get_db)):
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
     return pet
+
+@router.get("/{pet_id}/scans", response_model=PetScanPage)
+async def list_pet_scans(
+    pet_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Scan history of a pet, newest first, served from the (pet_id, created_at) index."""
+    qa = PetScan.result["qa"]
+    query = (
+        select(
+            PetScan.id,
+            PetScan.created_at,
+            PetScan.is_valid_pet,
+            PetScan.is_healthy,
+            qa["detected_pet"].as_string().label("detected_pet"),
+            qa["suspected_condition"].as_string().label("suspected_condition"),
+            qa["severity"].as_string().label("severity"),
+        )
+        .where(PetScan.pet_id == pet_id)
+        .order_by(PetScan.created_at.desc(), PetScan.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        query = query.where(tuple_(PetScan.created_at, PetScan.id) < tuple_(*_decode_cursor(cursor)))
+
+    rows = (await db.execute(query)).mappings().all()
+    if not rows and not cursor and await db.get(Pet, pet_id) is None:
+        raise HTTPException(status_code=404, detail="Pet not found")
+
+    items = [PetScanSummary.model_validate(dict(row)) for row in rows[:limit]]
+    next_cursor = _encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > limit else None
+    return PetScanPage(items=items, next_cursor=next_cursor)
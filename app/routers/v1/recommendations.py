@@ -6,6 +6,8 @@ from sqlalchemy import select
 
 from app.utils.db_init import get_db
 from app.models.pet_kb import PetKB
+from app.schemas.triage import TriageResult
+from app.services.triage import triage_engine
 
 router = APIRouter(prefix="/recommendations", tags=["Recommendations"])
 
@@ -13,8 +15,14 @@ class RecommendationRequest(BaseModel):
     pet_name: str
     disease_name: str
     severity: Optional[str] = "unknown"
+    symptoms: List[str] = []
 
-@router.post("/home-care")
+class HomeCareResponse(BaseModel):
+    treatment_guidance: str
+    home_care_bullets: List[str]
+    disclaimer: str
+
+@router.post("/home-care", response_model=HomeCareResponse)
 async def get_home_care(req: RecommendationRequest, db: AsyncSession = Depends(get_db)):
     """Fetch home care guidance based on KB and AI rules."""
     query = select(PetKB).where(
@@ -37,28 +45,12 @@ async def get_home_care(req: RecommendationRequest, db: AsyncSession = Depends(g
         "disclaimer": "This is AI-generated advice. Consult a certified veterinarian before starting any treatment."
     }
 
-@router.post("/emergency")
+@router.post("/emergency", response_model=TriageResult)
 async def check_emergency(req: RecommendationRequest):
-    """Determine if the situation requires immediate veterinary attention."""
-    
-    is_emergency = False
-    reason = "Symptoms appear manageable at home, but monitor closely."
-    next_steps = ["Schedule a regular vet appointment", "Monitor for worsening symptoms"]
-    
-    disease = req.disease_name.lower()
-    severity = req.severity.lower() if req.severity else ""
-    
-    if "rabies" in disease or "parvovirus" in disease:
-        is_emergency = True
-        reason = f"Condition '{req.disease_name}' is highly life-threatening and requires immediate isolation and treatment."
-        next_steps = ["GO TO EMERGENCY VET NOW", "Isolate pet immediately"]
-    elif severity in ["severe", "critical"]:
-        is_emergency = True
-        reason = "Severity level is critical. Vital functions may be at risk."
-        next_steps = ["Contact emergency clinic immediately", "Prepare pet for transport"]
-        
-    return {
-        "is_emergency": is_emergency,
-        "reason": reason,
-        "next_steps": next_steps
-    }
+    """Determine if the situation requires immediate veterinary attention, using the triage rules."""
+    return await triage_engine.evaluate(
+        disease_name=req.disease_name,
+        symptoms=req.symptoms,
+        severity=req.severity,
+        pet_type=req.pet_name,
+    )
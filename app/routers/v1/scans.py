@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from datetime import datetime
+from typing import List, Literal, Optional
+import asyncio
 import logging
+import os
 
+from app.config.settings import settings
 from app.utils.db_init import get_db
 from app.models.pet_scan import PetScan
+from app.schemas.common import MessageResponse
+from app.schemas.scans import ScanRecord, ScanResult, ScanSummary
+from app.services import bbox, http_cache
+from app.services.scan_export import MEDIA_TYPES, export_scans, parquet_available
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/scans", tags=["Scans"])
 
-@router.get("/")
+@router.get("/", response_model=List[ScanRecord])
 async def get_scans(
     limit: int = Query(20, ge=1, le=200),
     offset: int = Query(0, ge=0),
@@ -20,36 +30,83 @@ async def get_scans(
     scans = result.scalars().all()
     return scans
 
-@router.get("/{scan_id}")
-async def get_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
+@router.get("/export")
+async def export_scan_history(
+    format: Literal["csv", "ndjson", "parquet"] = Query("csv"),
+    start: Optional[datetime] = Query(None, description="Only scans created at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only scans created before this time"),
+):
+    """Stream the scan history with flattened QA fields and bounding box counts."""
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires the pyarrow package.")
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return StreamingResponse(
+        export_scans(format, start, end),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=scans.{format}"},
+    )
+
+async def _load_scan(scan_id: str, view: str, request: Request, response: Response, db: AsyncSession) -> PetScan:
+    """Load a scan for a cacheable view; raises 304 when the client's ETag is current."""
+    cache_control = http_cache.policy(settings.HTTP_CACHE_SCAN_MAX_AGE)
+    if "if-none-match" in request.headers:
+        # Revalidation: compare with the stored hash without loading the result JSON
+        stored = (await db.execute(
+            select(PetScan.result_hash, PetScan.pet_id).where(PetScan.id == scan_id)
+        )).first()
+        if stored and stored.result_hash:
+            current = http_cache.etag(view, scan_id, stored.result_hash, stored.pet_id)
+            http_cache.conditional(request, response, current, cache_control)
+
     query = select(PetScan).where(PetScan.id == scan_id)
     result = await db.execute(query)
     scan = result.scalars().first()
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
+    # Scans saved before result_hash existed get it computed here
+    result_hash = scan.result_hash or http_cache.content_hash(scan.result)
+    http_cache.conditional(request, response, http_cache.etag(view, scan.id, result_hash, scan.pet_id), cache_control)
     return scan
 
-@router.get("/{scan_id}/summary")
-async def get_scan_summary(scan_id: str, db: AsyncSession = Depends(get_db)):
+@router.get("/{scan_id}", response_model=ScanRecord)
+async def get_scan(scan_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    return await _load_scan(scan_id, "scan", request, response, db)
+
+@router.get("/{scan_id}/summary", response_model=ScanSummary)
+async def get_scan_summary(scan_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """Return a brief health summary of the scan."""
-    query = select(PetScan).where(PetScan.id == scan_id)
-    result = await db.execute(query)
-    scan = result.scalars().first()
-    if not scan:
-        raise HTTPException(status_code=404, detail="Scan not found")
-    
+    scan = await _load_scan(scan_id, "summary", request, response, db)
+
     # Extract from result JSON
-    res_data = scan.result or {}
-    qa = res_data.get("qa", {})
+    qa = ScanResult.from_stored(scan.result).qa
     
     return {
         "scan_id": scan.id,
         "is_healthy": scan.is_healthy,
-        "disease": qa.get("suspected_condition", "None"),
-        "severity": qa.get("severity") or "unknown",
+        "disease": qa.suspected_condition if qa.suspected_condition is not None else "None",
+        "severity": qa.severity or "unknown",
         "timestamp": scan.created_at
     }
 
+@router.get("/{scan_id}/overlay")
+async def get_scan_overlay(scan_id: str, db: AsyncSession = Depends(get_db)):
+    """Thumbnail of the scanned image with its bounding boxes drawn in, rendered once per scan."""
+    headers = {"Cache-Control": "private, max-age=86400"}
+    path = bbox.overlay_path(scan_id)
+    if os.path.exists(path):
+        return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+    result = await db.execute(select(PetScan.result).where(PetScan.id == scan_id))
+    stored = result.first()
+    if not stored:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    detections = ScanResult.from_stored(stored.result).bboxes
+    path = await asyncio.to_thread(bbox.render_overlay, scan_id, detections)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No image stored for this scan")
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
 @router.post("/{scan_id}/reanalyze")
 async def reanalyze_scan(scan_id: str):
     """Re-run AI analysis using stored image (Stub)."""
@@ -59,7 +116,7 @@ async def reanalyze_scan(scan_id: str):
         detail="Re-analysis is not yet implemented as original images are not persistently stored in local mode."
     )
 
-@router.delete("/{scan_id}")
+@router.delete("/{scan_id}", response_model=MessageResponse)
 async def delete_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
     """Delete a scan record (hard delete)."""
     query = select(PetScan).where(PetScan.id == scan_id)
@@ -70,4 +127,5 @@ async def delete_scan(scan_id: str, db: AsyncSession = Depends(get_db)):
     
     await db.delete(scan)
     await db.commit()
+    await asyncio.to_thread(bbox.delete_images, scan_id)
     return {"message": f"Scan {scan_id} deleted successfully."}
@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from pydantic import BaseModel
 from typing import List, Dict
 
+from app.config.settings import settings
 from app.utils.db_init import get_db
 from app.models.pet_scan import PetScan
+from app.services import http_cache
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
 
-@router.get("/scans")
+class ScanStats(BaseModel):
+    total_scans: int
+    healthy: int
+    unhealthy: int
+
+class DiseaseCount(BaseModel):
+    disease_name: str
+    count: int
+
+async def stats_validators(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """Scans are only added or deleted, so their count and latest created_at identify the stats."""
+    count, latest = (await db.execute(select(func.count(PetScan.id), func.max(PetScan.created_at)))).one()
+    etag = http_cache.etag("stats", request.url.path, count, latest)
+    http_cache.conditional(request, response, etag, http_cache.policy(settings.HTTP_CACHE_STATS_MAX_AGE))
+
+@router.get("/scans", response_model=ScanStats, dependencies=[Depends(stats_validators)])
 async def get_scan_stats(db: AsyncSession = Depends(get_db)):
     """Return counts for total, healthy, and unhealthy scans."""
     total = await db.scalar(select(func.count(PetScan.id)))
@@ -21,7 +39,7 @@ async def get_scan_stats(db: AsyncSession = Depends(get_db)):
         "unhealthy": unhealthy or 0
     }
 
-@router.get("/diseases")
+@router.get("/diseases", response_model=List[DiseaseCount], dependencies=[Depends(stats_validators)])
 async def get_top_diseases(db: AsyncSession = Depends(get_db)):
     """Aggregate top diseases from scan results."""
     # Since disease name is likely in the 'result' JSON or we should have a disease_name column
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List
+
+from app.utils.db_init import get_db
+from app.models.triage_rule import TriageRule
+from app.routers.v1.admin import require_admin
+from app.schemas.common import MessageResponse
+from app.schemas.triage import TriageRuleCreate, TriageRuleResponse
+from app.services.triage import triage_engine
+
+router = APIRouter(prefix="/triage/rules", tags=["Triage"], dependencies=[Depends(require_admin)])
+
+@router.get("/", response_model=List[TriageRuleResponse])
+async def list_rules(db: AsyncSession = Depends(get_db)):
+    """List all triage rules, including disabled ones."""
+    result = await db.execute(select(TriageRule).order_by(TriageRule.priority.desc(), TriageRule.id))
+    return result.scalars().all()
+
+@router.post("/", response_model=TriageRuleResponse, status_code=201)
+async def create_rule(rule: TriageRuleCreate, db: AsyncSession = Depends(get_db)):
+    """Add a triage rule; it applies from the next evaluation on."""
+    new_rule = TriageRule(**rule.model_dump())
+    db.add(new_rule)
+    await db.commit()
+    await db.refresh(new_rule)
+    triage_engine.invalidate()
+    return new_rule
+
+@router.put("/{id}", response_model=TriageRuleResponse)
+async def update_rule(id: int, rule: TriageRuleCreate, db: AsyncSession = Depends(get_db)):
+    """Replace a triage rule."""
+    item = await db.get(TriageRule, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Triage rule not found")
+    for field, value in rule.model_dump().items():
+        setattr(item, field, value)
+    await db.commit()
+    await db.refresh(item)
+    triage_engine.invalidate()
+    return item
+
+@router.delete("/{id}", response_model=MessageResponse)
+async def delete_rule(id: int, db: AsyncSession = Depends(get_db)):
+    """Delete a triage rule."""
+    item = await db.get(TriageRule, id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Triage rule not found")
+    await db.delete(item)
+    await db.commit()
+    triage_engine.invalidate()
+    return {"message": "Triage rule deleted"}
@@ -1,24 +1,51 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from typing import Optional
 import logging
 
 from app.services.gemini import gemini_service
+from app.services.prefilter import prefilter_service
+from app.services.admission import admit
+from app.services import deadline
+from app.config.settings import settings
+from app.services import bbox
+from app.schemas.vision import VisionDetections, VisionValidation
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/vision", tags=["Vision Only"])
+router = APIRouter(
+    prefix="/vision",
+    tags=["Vision Only"],
+    dependencies=[
+        Depends(deadline.request_deadline(settings.DEADLINE_VISION_SECONDS), scope="function"),
+        Depends(admit),
+    ],
+)
 
-@router.post("/validate")
+@router.post("/validate", response_model=VisionValidation)
 async def validate_pet(image: UploadFile = File(...)):
     """Quickly validate if the image contains a pet."""
     try:
         image_bytes = await image.read()
+        prefilter = await prefilter_service.screen(image_bytes)
+        if prefilter.rejected:
+            return {
+                "is_valid_pet": False,
+                "confidence": round(1 - prefilter.rejection["pet_probability"], 2),
+            }
+
         # Use an empty string for pet_type since we are just validating
         qa_result = await gemini_service.run_qa_analysis(image_bytes, pet_type="unknown")
-        
+        prefilter.observe(qa_result.is_valid_pet)
+
+        confidence = qa_result.confidence
+        if confidence is None:
+            # Gemini doesn't always return confidence, fake it here
+            confidence = 0.95 if qa_result.is_valid_pet else 0.1
         return {
-            "is_valid_pet": qa_result.get("is_valid_pet", False),
-            "confidence": 0.95 if qa_result.get("is_valid_pet") else 0.1 # Gemini doesn't always return confidence, as fake here
+            "is_valid_pet": qa_result.is_valid_pet,
+            "confidence": confidence,
         }
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Validation failed: {e}")
         # If it's likely a quota issue (simplified check)
@@ -26,7 +53,7 @@ async def validate_pet(image: UploadFile = File(...)):
             raise HTTPException(status_code=503, detail="Gemini API quota exceeded. Please try again later.")
         raise HTTPException(status_code=500, detail="Vision validation failed.")
 
-@router.post("/bboxes")
+@router.post("/bboxes", response_model=VisionDetections)
 async def detect_bboxes(
     image: UploadFile = File(...),
     disease_name: Optional[str] = Form(None)
@@ -35,7 +62,9 @@ async def detect_bboxes(
     try:
         image_bytes = await image.read()
         bbox_result = await gemini_service.generate_bounding_boxes(image_bytes)
-        return bbox_result
+        return {"detections": bbox.postprocess(bbox_result.detections, bbox.image_size(image_bytes))}
+    except deadline.DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"BBOX detection failed: {e}")
         raise HTTPException(status_code=500, detail="Spatial analysis failed.")
@@ -0,0 +1,4 @@
+from pydantic import BaseModel
+
+class MessageResponse(BaseModel):
+    message: str
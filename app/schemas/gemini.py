@@ -0,0 +1,92 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Type
+
+# Response schemas passed to Gemini structured output.
+# The Gemini API rejects default values in response schemas, so every field is required;
+# per-field fallbacks live in REPAIRS instead.
+
+class QAResult(BaseModel):
+    is_valid_pet: bool
+    detected_pet: str
+    is_healthy: bool
+    suspected_condition: str
+    severity: str
+    confidence: Optional[float]
+
+class Detection(BaseModel):
+    label: str
+    box_2d: List[int]
+
+class BoundingBoxes(BaseModel):
+    detections: List[Detection]
+
+class PetInfo(BaseModel):
+    common_name: str
+    scientific_name: str
+
+class DiseaseInfo(BaseModel):
+    common_name: str
+    scientific_name: str
+    pathogen_type: str
+    cause: str
+    symptoms: str
+    transmission_mode: str
+    severity: str
+
+class Management(BaseModel):
+    home_care: List[str]
+    veterinary_treatment: List[str]
+
+class DiagnosticAnalysis(BaseModel):
+    is_valid_pet: bool
+    detected_pet_type: str
+    pet_info: PetInfo
+    disease_info: DiseaseInfo
+    management: Management
+
+class FullDiagnosis(BaseModel):
+    disease_overview: str
+    common_symptoms: List[str]
+    general_treatment: List[str]
+    home_care_tips: List[str]
+    when_to_visit_vet: List[str]
+    disclaimer: str
+
+class CombinedAnalysis(BaseModel):
+    is_valid_pet: bool
+    detected_pet: str
+    is_healthy: bool
+    suspected_condition: str
+    severity: str
+    confidence: Optional[float]
+    detections: List[Detection]
+    diagnosis: Optional[FullDiagnosis]
+
+
+DISCLAIMER = "This is AI-generated and not a substitute for professional veterinary advice."
+
+_QA_REPAIRS: Dict[str, Any] = {
+    "detected_pet": "Unknown",
+    "suspected_condition": "",
+    "severity": "",
+    "confidence": None,
+}
+
+# Fallback value per top-level field, used to repair a malformed field without a new model call.
+# Fields missing here (e.g. is_valid_pet, is_healthy) are re-requested from the model instead.
+REPAIRS: Dict[Type[BaseModel], Dict[str, Any]] = {
+    QAResult: _QA_REPAIRS,
+    BoundingBoxes: {},
+    DiagnosticAnalysis: {
+        "pet_info": {"common_name": "", "scientific_name": ""},
+        "management": {"home_care": [], "veterinary_treatment": []},
+    },
+    FullDiagnosis: {
+        "common_symptoms": [],
+        "general_treatment": [],
+        "home_care_tips": [],
+        "when_to_visit_vet": [],
+        "disclaimer": DISCLAIMER,
+    },
+    CombinedAnalysis: {**_QA_REPAIRS, "diagnosis": None},
+}
@@ -1,27 +1,16 @@
 from pydantic import BaseModel
-from typing import List, Optional, Any
+from typing import Any, Dict, Optional
 
-class PetDetails(BaseModel):
-    name: str
-    age: str
-    gender: str
-    breed: str
-
-class DiseaseAnalysis(BaseModel):
-    disease_name: str
-    severity: str
-    symptoms: List[str]
-    precautions: List[str]
-    home_care: List[str]
-    vet_treatment: List[str]
+from app.schemas.scans import ScanResult
 
 class PetScanResponse(BaseModel):
-    scan_id: str
+    """
+    Response of POST /pets/scan (sent with None fields left out).
+    Rejected images only carry is_valid_pet, message and qa_details.
+    """
+    scan_id: Optional[str] = None
     is_valid_pet: bool
-    is_healthy: bool
-    pet_details: PetDetails
-    disease_analysis: Optional[DiseaseAnalysis] = None
-    original_image_url: str
-    bbox_url: Optional[str] = None
-    kb_suggestions: List[str] = []
-    disclaimer: str = "Consult a certified veterinarian for final diagnosis."
+    is_healthy: Optional[bool] = None
+    analysis: Optional[ScanResult] = None
+    message: str
+    qa_details: Optional[Dict[str, Any]] = None
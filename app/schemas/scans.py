@@ -0,0 +1,79 @@
+import logging
+from datetime import datetime
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, List, Optional
+
+from app.schemas.gemini import Detection, FullDiagnosis
+from app.schemas.triage import TriageResult
+
+logger = logging.getLogger(__name__)
+
+class ScanQA(BaseModel):
+    """QA block of a stored scan; older rows may miss the newer fields."""
+    is_valid_pet: bool = True
+    detected_pet: Optional[str] = None
+    is_healthy: bool = True
+    suspected_condition: Optional[str] = None
+    severity: Optional[str] = None
+    confidence: Optional[float] = None
+
+class ScanDetection(Detection):
+    """Stored detection: box_2d clamped to 0-1000, box_px in pixels of the uploaded image."""
+    box_px: Optional[List[int]] = None
+
+class ScanResult(BaseModel):
+    """Shape of PetScan.result."""
+    qa: ScanQA = Field(default_factory=ScanQA)
+    bboxes: List[ScanDetection] = []
+    diagnosis: Optional[FullDiagnosis] = None
+    image_size: Optional[List[int]] = None  # [width, height] of the uploaded image
+    triage: Optional[TriageResult] = None
+
+    @classmethod
+    def from_stored(cls, result: Optional[Dict[str, Any]]) -> "ScanResult":
+        """Parse a stored result, keeping at least the QA block of malformed rows."""
+        try:
+            return cls.model_validate(result or {})
+        except ValidationError as e:
+            logger.warning(f"Stored scan result does not match ScanResult: {e.error_count()} errors")
+            try:
+                return cls(qa=ScanQA.model_validate((result or {}).get("qa") or {}))
+            except ValidationError:
+                return cls()
+
+class ScanRecord(BaseModel):
+    """A stored scan as returned by the API."""
+    id: str
+    created_at: Optional[datetime] = None
+    pet_id: Optional[str] = None
+    is_valid_pet: Optional[bool] = None
+    is_healthy: Optional[bool] = None
+    result: Optional[Dict[str, Any]] = None
+
+    class Config:
+        from_attributes = True
+
+class ScanSummary(BaseModel):
+    scan_id: str
+    is_healthy: Optional[bool] = None
+    disease: str
+    severity: str
+    timestamp: Optional[datetime] = None
+
+class DiagnosisScanSummary(BaseModel):
+    scan_id: str
+    is_healthy: Optional[bool] = None
+    severity: Optional[str] = None
+
+class KBTreatment(BaseModel):
+    treatment: str
+
+class CombinedDiagnosis(BaseModel):
+    """Response of GET /scans/{id}/diagnosis."""
+    pet_name: str
+    disease_name: str
+    summary: DiagnosisScanSummary
+    kb: KBTreatment
+    full_diagnosis: FullDiagnosis
+    diagnosis_source: Optional[str] = None  # scan | catalog | live
+    ai_status: str
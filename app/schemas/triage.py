@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+Urgency = Literal["emergency", "urgent", "routine"]
+
+class TriageResult(BaseModel):
+    is_emergency: bool
+    urgency: Urgency
+    reason: str
+    next_steps: List[str]
+    matched_rules: List[str] = []
+
+class TriageRuleCreate(BaseModel):
+    name: str
+    keywords: List[str] = Field(default_factory=list, examples=[["rabies", "hydrophobia"]])
+    severities: List[str] = []
+    pet_types: List[str] = []
+    urgency: Urgency
+    priority: int = 0
+    reason: str
+    next_steps: List[str] = []
+    enabled: bool = True
+
+class TriageRuleResponse(TriageRuleCreate):
+    id: int
+
+    class Config:
+        from_attributes = True
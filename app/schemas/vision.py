@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from app.schemas.scans import ScanDetection
+
+class VisionValidation(BaseModel):
+    is_valid_pet: bool
+    confidence: Optional[float] = None
+
+class VisionDetections(BaseModel):
+    detections: List[ScanDetection]
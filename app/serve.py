@@ -0,0 +1,61 @@
+"""
+Production entry point: N uvicorn worker processes sharing one cache backend.
+
+    WEB_CONCURRENCY=4 CACHE_BACKEND=sqlite python -m app.serve
+
+Use `python -m app.main` (auto-reload, single process) for local development.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def _create_tables():
+    """Create tables (and seed the bundled KB and triage rules) once before forking workers, so they don't race."""
+    from app.main import Base, engine, kb_service, triage_engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    if settings.KB_SYNC_ON_STARTUP:
+        await kb_service.sync_bundled_csv()
+    await triage_engine.seed_defaults()
+    await engine.dispose()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    workers = max(1, settings.WEB_CONCURRENCY)
+
+    if workers > 1:
+        if settings.CACHE_BACKEND == "memory":
+            logger.warning(
+                "CACHE_BACKEND=memory with several workers: every worker keeps its own cache. "
+                "Use CACHE_BACKEND=sqlite (one host) or redis (several hosts) to share it."
+            )
+        # Prometheus multi-process mode: workers write metrics to a shared, clean directory
+        metrics_dir = os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "pet_disease_metrics")
+        )
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+        asyncio.run(_create_tables())
+
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
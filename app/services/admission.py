@@ -0,0 +1,209 @@
+"""
+Admission control for the model-calling routes.
+
+Each request is classified as `interactive` (default) or `bulk` (X-Priority: bulk,
+or an API key listed in ADMISSION_BULK_API_KEYS) and identified by its X-API-Key
+header or client address.
+
+1. A per-client token bucket limits the request rate of each class.
+2. At most ADMISSION_MAX_CONCURRENCY requests run at once per worker, and
+   ADMISSION_INTERACTIVE_RESERVED of those slots are kept free for interactive work.
+3. When saturated, requests wait in a per-class FIFO queue; freed slots go to
+   interactive waiters first. Waiting longer than the class limit (short for bulk)
+   or a full queue gives a 429 with Retry-After.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from app.config.settings import settings
+from app.services import deadline, metrics
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_ORDER = (INTERACTIVE, BULK)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int,
+        interactive_reserved: int,
+        max_queue: int,
+        max_wait: Dict[str, float],
+        rates: Dict[str, Tuple[float, int]],
+        max_clients: int = 10000,
+    ):
+        self.max_concurrency = max_concurrency
+        self.interactive_reserved = interactive_reserved
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.rates = rates
+        self.max_clients = max_clients
+        self._in_flight: Dict[str, int] = {name: 0 for name in PRIORITY_ORDER}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in PRIORITY_ORDER}
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        # Smoothed time a request holds its slot, for Retry-After estimates
+        self._hold_ewma = 1.0
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._in_flight.values())
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    def _check_rate(self, client: str, priority: str) -> None:
+        rate, burst = self.rates[priority]
+        if rate <= 0:
+            return
+        key = (client, priority)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        allowed, wait = bucket.take()
+        if not allowed:
+            raise AdmissionRejected("rate_limited", wait)
+
+    def _has_slot(self, priority: str) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            return False
+        if priority == BULK:
+            return self._in_flight[BULK] < self.max_concurrency - self.interactive_reserved
+        return True
+
+    def _retry_after(self) -> float:
+        return self._hold_ewma * (self.queue_depth() + 1) / max(self.max_concurrency, 1)
+
+    async def acquire(self, client: str, priority: str) -> float:
+        """Wait for a slot; returns the time admitted. Raises AdmissionRejected."""
+        self._check_rate(client, priority)
+
+        start = time.monotonic()
+        # Queued requests of the same or a higher priority go first
+        ahead = any(self._waiters[p] for p in PRIORITY_ORDER[: PRIORITY_ORDER.index(priority) + 1])
+        if not ahead and self._has_slot(priority):
+            self._in_flight[priority] += 1
+            metrics.ADMISSION_WAIT_SECONDS.labels(priority=priority).observe(0)
+            return start
+
+        if self.queue_depth() >= self.max_queue:
+            raise AdmissionRejected("queue_full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        metrics.ADMISSION_QUEUE_DEPTH.labels(priority=priority).inc()
+        try:
+            max_wait = self.max_wait[priority]
+            left = deadline.remaining()
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max_wait if left is None else min(max_wait, left))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up
+                if isinstance(e, asyncio.TimeoutError):
+                    return self._admitted(priority, start)
+                self.release(priority, start)
+                raise
+            waiter.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise AdmissionRejected("timeout", self._retry_after())
+        finally:
+            metrics.ADMISSION_QUEUE_DEPTH.labels(priority=priority).dec()
+            if waiter in self._waiters[priority]:
+                self._waiters[priority].remove(waiter)
+        return self._admitted(priority, start)
+
+    def _admitted(self, priority: str, start: float) -> float:
+        metrics.ADMISSION_WAIT_SECONDS.labels(priority=priority).observe(time.monotonic() - start)
+        return start
+
+    def release(self, priority: str, admitted_at: float) -> None:
+        self._hold_ewma = 0.9 * self._hold_ewma + 0.1 * (time.monotonic() - admitted_at)
+        self._in_flight[priority] -= 1
+        # Hand freed slots to waiters, interactive first
+        for name in PRIORITY_ORDER:
+            queue = self._waiters[name]
+            while queue and self._has_slot(name):
+                waiter = queue.popleft()
+                if not waiter.done():
+                    self._in_flight[name] += 1
+                    waiter.set_result(None)
+
+
+admission_controller = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    interactive_reserved=settings.ADMISSION_INTERACTIVE_RESERVED,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_wait={INTERACTIVE: settings.ADMISSION_INTERACTIVE_MAX_WAIT, BULK: settings.ADMISSION_BULK_MAX_WAIT},
+    rates={
+        INTERACTIVE: (settings.ADMISSION_INTERACTIVE_RATE, settings.ADMISSION_INTERACTIVE_BURST),
+        BULK: (settings.ADMISSION_BULK_RATE, settings.ADMISSION_BULK_BURST),
+    },
+)
+
+_BULK_API_KEYS = {key.strip() for key in settings.ADMISSION_BULK_API_KEYS.split(",") if key.strip()}
+
+
+def classify(request: Request) -> Tuple[str, str]:
+    """(client key, priority class) of a request."""
+    api_key: Optional[str] = request.headers.get("x-api-key")
+    client = f"key:{api_key}" if api_key else f"ip:{request.client.host if request.client else 'unknown'}"
+    if (api_key and api_key in _BULK_API_KEYS) or request.headers.get("x-priority", "").lower() == BULK:
+        return client, BULK
+    return client, INTERACTIVE
+
+
+async def admit(request: Request):
+    """FastAPI dependency guarding model-calling routes."""
+    if not settings.ADMISSION_ENABLED:
+        yield
+        return
+
+    client, priority = classify(request)
+    try:
+        admitted_at = await admission_controller.acquire(client, priority)
+    except AdmissionRejected as e:
+        metrics.ADMISSION_REJECTIONS.labels(priority=priority, reason=e.reason).inc()
+        raise HTTPException(
+            status_code=429,
+            detail=f"Server busy ({e.reason.replace('_', ' ')}), please retry later.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    try:
+        yield
+    finally:
+        admission_controller.release(priority, admitted_at)
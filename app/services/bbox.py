@@ -0,0 +1,248 @@
+"""
+Bounding box post-processing and overlay thumbnails.
+
+`postprocess_batch` cleans the detections of many images in one pass:
+
+1. Coordinates are clamped to Gemini's 0-1000 scale, inverted corners are
+   swapped and boxes smaller than BBOX_MIN_SIZE are dropped.
+2. Duplicates are removed with non-maximum suppression, run per image so
+   the IoU matrix only covers that image's few boxes.
+3. Boxes are converted to pixels ([ymin, xmin, ymax, xmax], like box_2d)
+   using each image's dimensions.
+
+At scan time a small JPEG thumbnail is stored per scan; `/scans/{id}/overlay`
+draws the boxes on it once and serves the cached file afterwards.
+
+    python -m app.services.bbox reprocess   # re-run the cleanup on stored scans
+"""
+import asyncio
+import io
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageOps, UnidentifiedImageError
+
+from app.config.settings import settings
+from app.schemas.gemini import Detection
+from app.schemas.scans import ScanDetection
+
+logger = logging.getLogger(__name__)
+
+SCALE = 1000
+OVERLAY_COLOR = (255, 59, 48)
+# EXIF orientations that swap width and height
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _nms(boxes: np.ndarray, threshold: float) -> np.ndarray:
+    """Greedy NMS in input order (Gemini lists the most salient region first); returns kept indices."""
+    area = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    top_left = np.maximum(boxes[:, None, :2], boxes[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+    inter = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    iou = inter / (area[:, None] + area[None, :] - inter)
+
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for i in range(len(boxes)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= iou[i] > threshold
+    return np.asarray(keep, dtype=int)
+
+
+def postprocess_batch(
+    detections: Sequence[Sequence[Detection]],
+    sizes: Sequence[Optional[Tuple[int, int]]],
+    iou_threshold: Optional[float] = None,
+    min_size: Optional[float] = None,
+) -> List[List[ScanDetection]]:
+    """Clean the detections of several images at once; `sizes` holds (width, height) or None per image."""
+    iou_threshold = settings.BBOX_IOU_THRESHOLD if iou_threshold is None else iou_threshold
+    min_size = settings.BBOX_MIN_SIZE if min_size is None else min_size
+    results: List[List[ScanDetection]] = [[] for _ in detections]
+
+    labels, coords, owners = [], [], []
+    for image_index, image_detections in enumerate(detections):
+        for detection in image_detections:
+            if len(detection.box_2d) == 4:
+                labels.append(detection.label)
+                coords.append(detection.box_2d)
+                owners.append(image_index)
+    if not coords:
+        return results
+
+    boxes = np.clip(np.asarray(coords, dtype=np.float64), 0, SCALE)
+    boxes = np.concatenate([np.minimum(boxes[:, :2], boxes[:, 2:]), np.maximum(boxes[:, :2], boxes[:, 2:])], axis=1)
+    owners = np.asarray(owners)
+
+    candidates = np.flatnonzero(((boxes[:, 2:] - boxes[:, :2]) >= min_size).all(axis=1))
+    if len(candidates):
+        # Boxes are grouped by image (owners ascending); suppress within each group only
+        groups = np.split(candidates, np.flatnonzero(np.diff(owners[candidates])) + 1)
+        candidates = np.concatenate([group[_nms(boxes[group], iou_threshold)] for group in groups])
+
+    # Per-box pixel scale [h, w, h, w] / 1000; NaN where the image size is unknown
+    dims = np.array([size if size else (np.nan, np.nan) for size in sizes], dtype=np.float64)
+    factors = dims[owners][:, [1, 0, 1, 0]] / SCALE
+    pixels = np.rint(boxes * factors)
+    normalized = np.rint(boxes).astype(int)
+
+    for i in candidates:
+        box_px = None if np.isnan(pixels[i]).any() else pixels[i].astype(int).tolist()
+        results[owners[i]].append(ScanDetection(label=labels[i], box_2d=normalized[i].tolist(), box_px=box_px))
+    return results
+
+
+def postprocess(detections: Sequence[Detection], size: Optional[Tuple[int, int]]) -> List[ScanDetection]:
+    return postprocess_batch([detections], [size])[0]
+
+
+def image_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) as displayed, read from the image header only."""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        width, height = image.size
+        if image.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        return width, height
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+def make_thumbnail(image_bytes: bytes) -> Tuple[Optional[Tuple[int, int]], Optional[bytes]]:
+    """(displayed image size, JPEG thumbnail bytes); JPEGs are decoded at reduced scale."""
+    size = image_size(image_bytes)
+    if size is None:
+        return None, None
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        side = settings.SCAN_THUMBNAIL_SIZE
+        image.draft("RGB", (side, side))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((side, side))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=80, optimize=True)
+        return size, buffer.getvalue()
+    except (UnidentifiedImageError, OSError) as e:
+        logger.warning(f"Could not create thumbnail: {e}")
+        return size, None
+
+
+def thumbnail_path(scan_id: str) -> str:
+    return os.path.join(settings.SCAN_THUMBNAIL_DIR, f"{scan_id}.jpg")
+
+
+def overlay_path(scan_id: str) -> str:
+    return os.path.join(settings.SCAN_THUMBNAIL_DIR, f"{scan_id}.overlay.jpg")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def save_thumbnail(scan_id: str, thumbnail: bytes) -> None:
+    _write_atomic(thumbnail_path(scan_id), thumbnail)
+
+
+def render_overlay(scan_id: str, detections: Sequence[Detection]) -> Optional[str]:
+    """Draw the boxes on the scan's thumbnail once; returns the cached overlay path, or None without a thumbnail."""
+    path = overlay_path(scan_id)
+    if os.path.exists(path):
+        return path
+    if not os.path.exists(thumbnail_path(scan_id)):
+        return None
+
+    image = Image.open(thumbnail_path(scan_id)).convert("RGB")
+    width, height = image.size
+    draw = ImageDraw.Draw(image)
+    line = max(2, round(max(width, height) / 160))
+    for detection in detections:
+        if len(detection.box_2d) != 4:
+            continue
+        ymin, xmin, ymax, xmax = detection.box_2d
+        rect = (xmin * width / SCALE, ymin * height / SCALE, xmax * width / SCALE, ymax * height / SCALE)
+        draw.rectangle(rect, outline=OVERLAY_COLOR, width=line)
+        draw.text((rect[0] + line + 1, rect[1] + line), detection.label, fill=OVERLAY_COLOR)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=80, optimize=True)
+    _write_atomic(path, buffer.getvalue())
+    return path
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def delete_images(scan_id: str) -> None:
+    for path in (thumbnail_path(scan_id), overlay_path(scan_id)):
+        _remove(path)
+
+
+async def _reprocess() -> None:
+    """Re-run the box cleanup on every stored scan, one batch of scans at a time."""
+    from sqlalchemy import select, update
+
+    from app.models.pet_scan import PetScan
+    from app.schemas.scans import ScanResult
+    from app.services.http_cache import content_hash
+    from app.utils.db_init import AsyncSessionLocal, engine
+
+    updated = 0
+    last_id = ""
+    try:
+        async with AsyncSessionLocal() as session:
+            while True:
+                rows = (await session.execute(
+                    select(PetScan.id, PetScan.result)
+                    .where(PetScan.id > last_id)
+                    .order_by(PetScan.id)
+                    .limit(settings.SCAN_EXPORT_BATCH_SIZE)
+                )).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                parsed = [ScanResult.from_stored(row.result) for row in rows]
+                cleaned = postprocess_batch(
+                    [result.bboxes for result in parsed],
+                    [tuple(result.image_size) if result.image_size else None for result in parsed],
+                )
+                changed = []
+                for row, result, boxes in zip(rows, parsed, cleaned):
+                    if not row.result or result.bboxes == boxes:
+                        continue
+                    stored = dict(row.result)
+                    stored["bboxes"] = [box.model_dump(exclude_none=True) for box in boxes]
+                    await session.execute(
+                        update(PetScan).where(PetScan.id == row.id).values(result=stored, result_hash=content_hash(stored))
+                    )
+                    changed.append(row.id)
+                await session.commit()
+                # Cached overlays show the old boxes; they are redrawn on the next request
+                for scan_id in changed:
+                    await asyncio.to_thread(_remove, overlay_path(scan_id))
+                updated += len(changed)
+    finally:
+        await engine.dispose()
+    print(f"Updated bounding boxes of {updated} scans.")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bounding box tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("reprocess", help="Clamp, deduplicate and convert the boxes of stored scans")
+    parser.parse_args()
+    asyncio.run(_reprocess())
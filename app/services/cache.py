@@ -0,0 +1,244 @@
+"""
+Pluggable cache backends, selected with CACHE_BACKEND:
+
+- memory: per-process LRU dict (default, single worker).
+- sqlite: a local SQLite file in WAL mode with memory-mapped reads, shared by
+          every worker process on the host.
+- redis:  any Redis-compatible server (CACHE_REDIS_URL), shared across hosts.
+
+Values are bytes; `get_or_set_json` adds orjson (de)serialization and hit/miss metrics.
+"""
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from app.config.settings import settings
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        """Atomically increment an integer counter, starting from 0."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.time():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        current = int((await self.get(key)) or 0) + 1
+        await self.set(key, str(current).encode())
+        return current
+
+
+class SQLiteCache(CacheBackend):
+    """Host-local cache shared by all worker processes through one SQLite file."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._conn()  # create the schema up front
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, fn: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] < time.time():
+            self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        return row[0]
+
+    def _set(self, key: str, value: bytes, ttl: Optional[int]) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None),
+        )
+        # Purge expired rows now and then instead of running a separate sweeper
+        if random.random() < 0.01:
+            conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+    def _incr(self, key: str) -> int:
+        row = self._conn().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, '1', NULL) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT) "
+            "RETURNING value",
+            (key,),
+        ).fetchone()
+        return int(row[0])
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self._run(self._get, key)
+        if isinstance(value, str):
+            # Counters are stored as text by _incr
+            return value.encode()
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        await self._run(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._run(lambda: self._conn().execute("DELETE FROM cache WHERE key = ?", (key,)))
+
+    async def incr(self, key: str) -> int:
+        return await self._run(self._incr, key)
+
+
+class RedisCache(CacheBackend):
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        await self._client.set(key, value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def create_cache_backend() -> CacheBackend:
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "memory":
+        return MemoryCache(settings.CACHE_MEMORY_MAX_ENTRIES)
+    if backend == "sqlite":
+        os.makedirs(os.path.dirname(os.path.abspath(settings.CACHE_SQLITE_PATH)), exist_ok=True)
+        return SQLiteCache(settings.CACHE_SQLITE_PATH)
+    if backend == "redis":
+        if not settings.CACHE_REDIS_URL:
+            raise ValueError("CACHE_REDIS_URL must be set when CACHE_BACKEND=redis")
+        return RedisCache(settings.CACHE_REDIS_URL)
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+cache = create_cache_backend()
+
+
+async def get_or_set_json(
+    namespace: str,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: Optional[int] = None,
+) -> Any:
+    """
+    Return the cached JSON value of `namespace:key`, computing and storing it on a miss.
+    Cache errors are logged and never fail the request.
+    """
+    full_key = f"{namespace}:{key}"
+    try:
+        cached = await cache.get(full_key)
+    except Exception as e:
+        logger.warning(f"Cache read failed for {full_key}: {e}")
+        cached = None
+    metrics.record_cache(namespace, cached is not None)
+    if cached is not None:
+        return orjson.loads(cached)
+
+    value = await compute()
+    try:
+        await cache.set(full_key, orjson.dumps(value), ttl=ttl)
+    except Exception as e:
+        logger.warning(f"Cache write failed for {full_key}: {e}")
+    return value
+
+
+async def get_version(name: str) -> int:
+    """Current value of a version counter (e.g. bumped on every KB write)."""
+    try:
+        return int((await cache.get(f"version:{name}")) or 0)
+    except Exception as e:
+        logger.warning(f"Cache version read failed for {name}: {e}")
+        return 0
+
+
+async def bump_version(name: str) -> int:
+    """Invalidate every cache key built from this version counter, on all workers."""
+    try:
+        return await cache.incr(f"version:{name}")
+    except Exception as e:
+        logger.warning(f"Cache version bump failed for {name}: {e}")
+        return 0
@@ -0,0 +1,173 @@
+"""
+Per-request deadlines and cancellation on client disconnect.
+
+Model-calling routes take their time budget from the X-Request-Timeout header
+(seconds) or the route's default, capped at DEADLINE_MAX_SECONDS. The budget is
+kept in a contextvar so the services below the route can see what is left:
+
+- a model call waits at most the remaining time (`bounded`),
+- retries, fallbacks and cascade escalations are skipped when their backoff plus
+  the model's median latency no longer fit (`can_afford`),
+- admission queueing and DB statements are capped to the remaining time.
+
+While the route runs the client connection is polled; when the client goes away
+the route is cancelled, except inside `critical()` blocks such as the DB commit.
+Cancelled requests answer 499, expired ones 504.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+HEADER = "X-Request-Timeout"
+CLIENT_CLOSED_REQUEST = 499
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out, or can't cover the next step."""
+
+
+class ClientDisconnected(Exception):
+    """The client went away; the rest of the work would not be read."""
+
+
+class Budget:
+    def __init__(self, seconds: float, task: Optional[asyncio.Task]):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.task = task
+        self.disconnected = False
+        self.critical = 0
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+_budget: ContextVar[Optional[Budget]] = ContextVar("request_budget", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request; None outside a request with a deadline."""
+    budget = _budget.get()
+    return None if budget is None else max(0.0, budget.remaining())
+
+
+def can_afford(seconds: float) -> bool:
+    budget = _budget.get()
+    return budget is None or budget.remaining() >= seconds
+
+
+def check() -> None:
+    """Raise if the client is gone or the deadline passed."""
+    budget = _budget.get()
+    if budget is None:
+        return
+    if budget.disconnected:
+        raise ClientDisconnected("Client closed the request")
+    if budget.remaining() <= 0:
+        raise DeadlineExceeded(f"Request deadline of {budget.seconds:g}s exceeded")
+
+
+async def bounded(awaitable: Awaitable[T]) -> T:
+    """Await `awaitable` for at most the remaining time."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, timeout=left)
+    except TimeoutError as e:
+        if isinstance(e, DeadlineExceeded):
+            raise
+        raise DeadlineExceeded("Request deadline exceeded") from None
+
+
+@contextmanager
+def critical():
+    """Let the enclosed block finish even if the client disconnects (e.g. a DB commit)."""
+    budget = _budget.get()
+    if budget is None:
+        yield
+        return
+    budget.critical += 1
+    try:
+        yield
+    finally:
+        budget.critical -= 1
+
+
+async def limit_statements(session: AsyncSession) -> None:
+    """Cap the statements of the current transaction to the remaining time (PostgreSQL only)."""
+    left = remaining()
+    conn = await session.connection()
+    if left is not None and conn.dialect.name == "postgresql":
+        await conn.execute(text(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}"))
+
+
+def _parse(value: Optional[str], default: float) -> float:
+    seconds = default
+    if value:
+        try:
+            seconds = float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid {HEADER} header, expected seconds.")
+        if seconds <= 0:
+            raise HTTPException(status_code=400, detail=f"{HEADER} must be positive.")
+    return min(seconds, settings.DEADLINE_MAX_SECONDS)
+
+
+async def _watch(request: Request, budget: Budget) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(settings.DEADLINE_DISCONNECT_POLL)
+    budget.disconnected = True
+    if not budget.critical:
+        logger.info(f"Client disconnected from {request.url.path}; cancelling")
+        budget.task.cancel()
+
+
+def request_deadline(default_seconds: float) -> Callable:
+    """
+    FastAPI dependency (use with scope="function") giving the route a deadline and
+    cancelling it when the client disconnects.
+    """
+    async def dependency(request: Request):
+        budget = Budget(_parse(request.headers.get(HEADER), default_seconds), asyncio.current_task())
+        token = _budget.set(budget)
+        watcher = asyncio.create_task(_watch(request, budget))
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        try:
+            yield budget
+        except asyncio.CancelledError:
+            if not budget.disconnected:
+                raise
+            # Our own cancellation; answer normally so the server doesn't log an error
+            budget.task.uncancel()
+            metrics.REQUEST_ABORTS.labels(route=route, reason="disconnected").inc()
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+        except ClientDisconnected:
+            metrics.REQUEST_ABORTS.labels(route=route, reason="disconnected").inc()
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+        except DeadlineExceeded as e:
+            metrics.REQUEST_ABORTS.labels(route=route, reason="deadline").inc()
+            raise HTTPException(status_code=504, detail=str(e))
+        finally:
+            watcher.cancel()
+            _budget.reset(token)
+
+    return dependency
@@ -0,0 +1,154 @@
+"""
+Pregenerated multilingual diagnosis catalog.
+
+A batch job generates the full diagnosis for every (pet_name, disease_name)
+pair in pet_kb and every language in DIAGNOSIS_CATALOG_LANGUAGES, with at most
+DIAGNOSIS_CATALOG_CONCURRENCY Gemini calls in flight. Each result is committed
+as it arrives, so an interrupted run resumes where it stopped. Results are
+stored under DIAGNOSIS_CATALOG_VERSION; bump it after changing the diagnosis
+prompt to build a fresh catalog while the previous version keeps serving.
+
+    python -m app.services.diagnosis_catalog build --languages English,Spanish
+    python -m app.services.diagnosis_catalog status
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.models.diagnosis_catalog import DiagnosisCatalog
+from app.models.pet_kb import PetKB
+from app.schemas.gemini import FullDiagnosis
+from app.utils.db_init import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def configured_languages() -> List[str]:
+    return [lang.strip() for lang in settings.DIAGNOSIS_CATALOG_LANGUAGES.split(",") if lang.strip()]
+
+
+async def lookup(db: AsyncSession, pet_name: str, disease_name: str, lang: str) -> Optional[FullDiagnosis]:
+    """Newest catalog diagnosis for an exact KB pair, if one was generated."""
+    result = await db.execute(
+        select(DiagnosisCatalog.diagnosis)
+        .where(
+            DiagnosisCatalog.pet_name == pet_name,
+            DiagnosisCatalog.disease_name == disease_name,
+            DiagnosisCatalog.lang == lang.lower(),
+            DiagnosisCatalog.version <= settings.DIAGNOSIS_CATALOG_VERSION,
+        )
+        .order_by(DiagnosisCatalog.version.desc())
+        .limit(1)
+    )
+    diagnosis = result.scalar()
+    return FullDiagnosis.model_validate(diagnosis) if diagnosis else None
+
+
+async def build(
+    languages: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    version: Optional[int] = None,
+) -> Dict[str, int]:
+    """Generate every missing (KB pair, language) entry of a catalog version."""
+    from app.services.gemini import gemini_service
+
+    languages = languages or configured_languages()
+    concurrency = concurrency or settings.DIAGNOSIS_CATALOG_CONCURRENCY
+    version = version or settings.DIAGNOSIS_CATALOG_VERSION
+
+    async with AsyncSessionLocal() as session:
+        pairs = (await session.execute(
+            select(PetKB.pet_name, PetKB.disease_name).distinct().order_by(PetKB.pet_name, PetKB.disease_name)
+        )).all()
+        done = set((await session.execute(
+            select(DiagnosisCatalog.pet_name, DiagnosisCatalog.disease_name, DiagnosisCatalog.lang)
+            .where(DiagnosisCatalog.version == version)
+        )).all())
+
+    todo = [
+        (pet_name, disease_name, lang)
+        for pet_name, disease_name in pairs
+        for lang in languages
+        if (pet_name, disease_name, lang.lower()) not in done
+    ]
+    total = len(pairs) * len(languages)
+    stats = {"total": total, "skipped": total - len(todo), "generated": 0, "failed": 0}
+    logger.info(f"Diagnosis catalog v{version}: {len(todo)} entries to generate, {stats['skipped']} already done")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.monotonic()
+
+    async def generate(pet_name: str, disease_name: str, lang: str):
+        async with semaphore:
+            try:
+                diagnosis = await gemini_service.get_full_diagnosis(pet_name, disease_name, lang, use_cache=False)
+            except Exception as e:
+                stats["failed"] += 1
+                logger.error(f"Catalog generation failed for {pet_name}/{disease_name}/{lang}: {e}")
+                return
+        async with AsyncSessionLocal() as session:
+            session.add(DiagnosisCatalog(
+                pet_name=pet_name,
+                disease_name=disease_name,
+                lang=lang.lower(),
+                version=version,
+                diagnosis=diagnosis.model_dump(),
+            ))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Written by a concurrent run
+                await session.rollback()
+        stats["generated"] += 1
+        finished = stats["generated"] + stats["failed"]
+        if finished % 10 == 0 or finished == len(todo):
+            logger.info(f"Diagnosis catalog: {finished}/{len(todo)} in {time.monotonic() - started:.0f}s")
+
+    await asyncio.gather(*(generate(*entry) for entry in todo))
+    return stats
+
+
+async def status() -> List[tuple]:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(DiagnosisCatalog.version, DiagnosisCatalog.lang, func.count())
+            .group_by(DiagnosisCatalog.version, DiagnosisCatalog.lang)
+            .order_by(DiagnosisCatalog.version, DiagnosisCatalog.lang)
+        )
+        return result.all()
+
+
+async def _cli(args) -> None:
+    from app.main import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        if args.command == "build":
+            languages = [lang.strip() for lang in args.languages.split(",")] if args.languages else None
+            print(await build(languages, args.concurrency, args.version))
+        else:
+            for version, lang, count in await status():
+                print(f"v{version}\t{lang}\t{count}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Diagnosis catalog batch job")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Generate missing catalog entries (resumable)")
+    build_parser.add_argument("--languages", help="Comma-separated languages (default DIAGNOSIS_CATALOG_LANGUAGES)")
+    build_parser.add_argument("--concurrency", type=int)
+    build_parser.add_argument("--version", type=int)
+    sub.add_parser("status", help="Entries per catalog version and language")
+    asyncio.run(_cli(parser.parse_args()))
@@ -1,15 +1,40 @@
 import asyncio
-import json
 import logging
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, TypeVar
 
+import orjson
 from google import genai
 from google.genai import types
+from pydantic import BaseModel, ValidationError, create_model
 
 from app.config.settings import settings
+from app.schemas.gemini import (
+    REPAIRS,
+    BoundingBoxes,
+    CombinedAnalysis,
+    DiagnosticAnalysis,
+    FullDiagnosis,
+    QAResult,
+)
+from app.schemas.scans import ScanResult
+from app.services import deadline, metrics, timing
+from app.services.cache import get_or_set_json
+from app.services.hedging import hedge_policy
+from app.services.routing import model_router
 
 logger = logging.getLogger(__name__)
 
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+
+class StructuredOutputError(ValueError):
+    """A model answer that could not be parsed or repaired into its response schema."""
+
+    def __init__(self, message: str, fields: Optional[List[str]] = None):
+        super().__init__(message)
+        self.fields = fields or []
+
 
 class GeminiService:
     def __init__(self):
@@ -17,6 +42,8 @@ class GeminiService:
         # Models from settings
         self.primary_model = settings.GEMINI_MODEL_PRIMARY
         self.fallback_model = settings.GEMINI_MODEL_FALLBACK
+        self.router = model_router
+        self.hedging = hedge_policy
 
     @property
     def client(self) -> genai.Client:
@@ -26,57 +53,177 @@ class GeminiService:
             self._client = genai.Client(api_key=settings.GEMINI_API_KEY)
         return self._client
 
+    async def _call_model(self, model: str, prompt_type: str, call: Callable[[], Any]) -> Any:
+        """Run a blocking SDK call in the executor, recording latency and errors."""
+        loop = asyncio.get_running_loop()
+        started_at = []
+
+        def run():
+            # Executor threads don't inherit the request context, so only note the start time here
+            started_at.append(time.perf_counter())
+            return call()
+
+        start = time.perf_counter()
+        ok: Optional[bool] = False
+        try:
+            # The executor thread can't be interrupted; past the deadline we just stop waiting for it
+            result = await deadline.bounded(loop.run_in_executor(None, run))
+            ok = True
+            return result
+        except (asyncio.CancelledError, deadline.DeadlineExceeded):
+            # Lost a hedge race, the caller went away or ran out of time; not a model failure
+            ok = None
+            raise
+        except Exception as e:
+            metrics.GEMINI_CALL_ERRORS.labels(
+                model=model, prompt_type=prompt_type, error=type(e).__name__
+            ).inc()
+            raise
+        finally:
+            end = time.perf_counter()
+            if ok is not None:
+                self.router.record(model, end - start, ok)
+            metrics.GEMINI_CALL_SECONDS.labels(model=model, prompt_type=prompt_type).observe(end - start)
+            if started_at:
+                timing.add_span("executor_queue", started_at[0] - start)
+                timing.add_span(f"gemini_{prompt_type}", end - started_at[0])
+
+    async def _call_hedged(self, model: str, prompt_type: str, call_for: Callable[[str], Callable[[], Any]]) -> Any:
+        """
+        Call the model; if it is slower than the adaptive hedge delay, fire a duplicate
+        (same or fallback model) and return whichever succeeds first.
+        The loser is cancelled; its executor thread still runs to completion, but its
+        result is discarded.
+        """
+        policy = self.hedging
+        policy.note_call()
+        start = time.perf_counter()
+        delay = policy.delay(prompt_type) if policy.enabled else None
+        if delay is None:
+            result = await self._call_model(model, prompt_type, call_for(model))
+            policy.record(prompt_type, time.perf_counter() - start)
+            return result
+
+        primary = asyncio.ensure_future(self._call_model(model, prompt_type, call_for(model)))
+        pending = {primary}
+        hedged = False
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                if policy.try_acquire():
+                    hedge_model = self.fallback_model if settings.HEDGE_TO_FALLBACK else model
+                    logger.info(f"Hedging {prompt_type} call after {delay:.2f}s (model={hedge_model})")
+                    pending.add(asyncio.ensure_future(self._call_model(hedge_model, prompt_type, call_for(hedge_model))))
+                    hedged = True
+                else:
+                    metrics.GEMINI_HEDGES.labels(prompt_type=prompt_type, outcome="capped").inc()
+
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if hedged:
+                            outcome = "primary_won" if task is primary else "hedge_won"
+                            metrics.GEMINI_HEDGES.labels(prompt_type=prompt_type, outcome=outcome).inc()
+                        policy.record(prompt_type, time.perf_counter() - start)
+                        return task.result()
+                    first_error = first_error or task.exception()
+            if hedged:
+                metrics.GEMINI_HEDGES.labels(prompt_type=prompt_type, outcome="failed").inc()
+            raise first_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _build_request(
+        prompt: str,
+        image_data: Optional[bytes],
+        mime_type: str,
+        response_mime_type: str,
+        temperature: float,
+        response_schema: Optional[Any] = None,
+    ):
+        if image_data is None:
+            # Text-only prompt
+            return prompt, types.GenerateContentConfig(
+                temperature=temperature,
+                response_mime_type=response_mime_type,
+                response_schema=response_schema,
+            )
+        contents = [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part(text=prompt),
+                    types.Part(
+                        inline_data=types.Blob(
+                            mime_type=mime_type,
+                            data=image_data,
+                        )
+                    ),
+                ],
+            )
+        ]
+        config = types.GenerateContentConfig(
+            temperature=temperature,
+            top_p=0.1,
+            candidate_count=1,
+            response_mime_type=response_mime_type,  # Force JSON mode
+            response_schema=response_schema,
+        )
+        return contents, config
+
+    def _can_afford(self, model: str, prompt_type: str, step: str, delay: float = 0) -> bool:
+        """Whether the request deadline still covers `delay` plus a typical call to `model`."""
+        expected = self.router.expected_latency(model) or settings.DEADLINE_MIN_CALL_SECONDS
+        if deadline.can_afford(delay + expected):
+            return True
+        logger.info(f"Skipping {step} of {prompt_type} on {model}: not enough time left before the deadline")
+        metrics.GEMINI_DEADLINE_SKIPS.labels(prompt_type=prompt_type, step=step).inc()
+        return False
+
     async def _generate_with_retry(
         self,
         prompt: str,
-        image_data: bytes,
+        image_data: Optional[bytes],
         mime_type: str = "image/jpeg",
         use_fallback: bool = False,
         retries: int = 2,
         response_mime_type: str = "application/json",
+        prompt_type: str = "generic",
+        model: Optional[str] = None,
+        allow_fallback: bool = True,
+        temperature: float = 0,
+        response_schema: Optional[Any] = None,
     ) -> str:
-        model = self.fallback_model if use_fallback else self.primary_model
+        model = model or (self.fallback_model if use_fallback else self.primary_model)
+        contents, config = self._build_request(
+            prompt, image_data, mime_type, response_mime_type, temperature, response_schema
+        )
 
         for attempt in range(retries):
             try:
                 # Ensure client is available
                 client = self.client
-                loop = asyncio.get_running_loop()
-                resp = await loop.run_in_executor(
-                    None,
-                    lambda: client.models.generate_content(
-                        model=model,
-                        contents=[
-                            types.Content(
-                                role="user",
-                                parts=[
-                                    types.Part(text=prompt),
-                                    types.Part(
-                                        inline_data=types.Blob(
-                                            mime_type=mime_type,
-                                            data=image_data,
-                                        )
-                                    ),
-                                ],
-                            )
-                        ],
-                        config=types.GenerateContentConfig(
-                            temperature=0,
-                            top_p=0.1,
-                            candidate_count=1,
-                            response_mime_type=response_mime_type,  # Force JSON mode
-                        ),
-                    ),
+                resp = await self._call_hedged(
+                    model,
+                    prompt_type,
+                    lambda m: lambda: client.models.generate_content(model=m, contents=contents, config=config),
                 )
                 return resp.text
 
+            except deadline.DeadlineExceeded:
+                raise
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed (model={model}): {e}")
 
                 # Last attempt -> try fallback once
                 if attempt == retries - 1:
-                    if not use_fallback:
+                    if not use_fallback and allow_fallback and self._can_afford(self.fallback_model, prompt_type, "fallback"):
                         logger.info("Switching to fallback model")
+                        metrics.GEMINI_FALLBACKS.labels(prompt_type=prompt_type).inc()
                         return await self._generate_with_retry(
                             prompt=prompt,
                             image_data=image_data,
@@ -84,23 +231,191 @@ class GeminiService:
                             use_fallback=True,
                             retries=1,
                             response_mime_type=response_mime_type,
+                            prompt_type=prompt_type,
+                            temperature=temperature,
+                            response_schema=response_schema,
                         )
                     raise
 
+                if not self._can_afford(model, prompt_type, "retry", delay=2 ** attempt):
+                    raise
+                metrics.GEMINI_RETRIES.labels(model=model, prompt_type=prompt_type).inc()
                 await asyncio.sleep(2 ** attempt)
 
         raise RuntimeError("Gemini call failed unexpectedly")
 
+    async def _generate_cascade(
+        self,
+        prompt: str,
+        image_data: Optional[bytes],
+        prompt_type: str,
+        schema: Type[SchemaT],
+        mime_type: str = "image/jpeg",
+        assess: Optional[Callable[[SchemaT], Optional[str]]] = None,
+        temperature: float = 0,
+    ) -> SchemaT:
+        """
+        Run a prompt through the model cascade, cheapest healthy model first.
+        Escalates to the next tier when the call fails, the answer can't be validated
+        against `schema`, or `assess` returns a reason (e.g. unhealthy, low confidence).
+        The last tier's answer is returned as-is.
+        """
+        tiers: List[str] = self.router.tiers()
+        result: Optional[SchemaT] = None
+        last_error: Optional[Exception] = None
+
+        for i, model in enumerate(tiers):
+            is_last = i == len(tiers) - 1
+            if i > 0 and not self._can_afford(model, prompt_type, "escalation"):
+                break
+            try:
+                text = await self._generate_with_retry(
+                    prompt,
+                    image_data,
+                    mime_type=mime_type,
+                    retries=2 if is_last else 1,
+                    prompt_type=prompt_type,
+                    model=model,
+                    allow_fallback=False,
+                    temperature=temperature,
+                    response_schema=schema,
+                )
+                candidate = await self._validate_structured(
+                    text, schema, prompt, image_data, mime_type, prompt_type, model, temperature
+                )
+            except deadline.DeadlineExceeded:
+                raise
+            except StructuredOutputError as e:
+                last_error = e
+                reason = "schema"
+            except Exception as e:
+                last_error = e
+                reason = "error"
+            else:
+                result = candidate
+                reason = assess(candidate) if assess else None
+                if reason is None:
+                    return candidate
+
+            if not is_last:
+                logger.info(f"Escalating {prompt_type} from {model} ({reason})")
+                metrics.GEMINI_ESCALATIONS.labels(prompt_type=prompt_type, from_model=model, reason=reason).inc()
+                if reason == "error":
+                    metrics.GEMINI_FALLBACKS.labels(prompt_type=prompt_type).inc()
+
+        if result is not None:
+            return result
+        raise last_error or RuntimeError("Gemini call failed unexpectedly")
+
     @staticmethod
     def _parse_json(text: str) -> Dict[str, Any]:
-        # In JSON mode, it should already be clean; but keep a safe cleanup
-        clean = text.replace("```json", "").replace("```", "").strip()
-        return json.loads(clean)
+        with timing.span("parse_json"):
+            try:
+                data = orjson.loads(text)
+            except orjson.JSONDecodeError:
+                # Structured output should already be clean; strip markdown fences just in case
+                clean = text.replace("```json", "").replace("```", "").strip()
+                try:
+                    data = orjson.loads(clean)
+                except orjson.JSONDecodeError as e:
+                    raise StructuredOutputError(f"Model answer is not valid JSON: {e}")
+        if not isinstance(data, dict):
+            raise StructuredOutputError(f"Model answer is a JSON {type(data).__name__}, expected an object")
+        return data
+
+    @staticmethod
+    def _repair(data: Dict[str, Any], schema: Type[SchemaT], prompt_type: str) -> Tuple[Optional[SchemaT], List[str]]:
+        """
+        Validate `data` against `schema`, repairing only the fields that fail:
+        invalid list items are dropped, other fields fall back to their REPAIRS value.
+        Returns the model, or None plus the fields that still need the model's help.
+        """
+        try:
+            return schema.model_validate(data), []
+        except ValidationError as e:
+            errors = e.errors()
+
+        repairs = REPAIRS.get(schema, {})
+        bad_items: Dict[str, set] = {}
+        unrepaired: List[str] = []
+        for err in errors:
+            loc = err["loc"]
+            field = str(loc[0])
+            value = data.get(field)
+            if len(loc) > 1 and isinstance(loc[1], int) and isinstance(value, list):
+                bad_items.setdefault(field, set()).add(loc[1])
+            elif field in repairs:
+                data[field] = repairs[field]
+                metrics.GEMINI_REPAIRS.labels(prompt_type=prompt_type, field=field, action="default").inc()
+            elif field not in unrepaired:
+                unrepaired.append(field)
+
+        for field, indexes in bad_items.items():
+            data[field] = [item for idx, item in enumerate(data[field]) if idx not in indexes]
+            metrics.GEMINI_REPAIRS.labels(prompt_type=prompt_type, field=field, action="drop_items").inc()
+
+        if unrepaired:
+            return None, unrepaired
+        try:
+            return schema.model_validate(data), []
+        except ValidationError as e:
+            return None, sorted({str(err["loc"][0]) for err in e.errors()})
+
+    async def _validate_structured(
+        self,
+        text: str,
+        schema: Type[SchemaT],
+        prompt: str,
+        image_data: Optional[bytes],
+        mime_type: str,
+        prompt_type: str,
+        model: str,
+        temperature: float,
+    ) -> SchemaT:
+        """Parse an answer into `schema`; fields that can't be repaired are re-requested alone."""
+        data = self._parse_json(text)
+        parsed, failing = self._repair(data, schema, prompt_type)
+        if parsed is not None:
+            return parsed
+
+        # Ask the same model for just the failing fields instead of redoing the whole answer
+        logger.info(f"Re-requesting fields {failing} of {prompt_type} answer (model={model})")
+        metrics.GEMINI_REPAIRS.labels(prompt_type=prompt_type, field=",".join(failing), action="retry").inc()
+        patch_schema = create_model(
+            f"{schema.__name__}Patch",
+            **{field: (schema.model_fields[field].annotation, ...) for field in failing if field in schema.model_fields},
+        )
+        field_prompt = (
+            f"{prompt}\n\nReturn ONLY these JSON fields: {', '.join(failing)}. "
+            f"Previous invalid answer: {text[:2000]}"
+        )
+        try:
+            patch_text = await self._generate_with_retry(
+                field_prompt,
+                image_data,
+                mime_type=mime_type,
+                retries=1,
+                prompt_type=prompt_type,
+                model=model,
+                allow_fallback=False,
+                temperature=temperature,
+                response_schema=patch_schema,
+            )
+            data.update(self._parse_json(patch_text))
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception as e:
+            raise StructuredOutputError(f"Field retry for {prompt_type} failed: {e}", failing)
+
+        try:
+            return schema.model_validate(data)
+        except ValidationError as e:
+            raise StructuredOutputError(f"Gemini {prompt_type} answer does not match schema: {e}", failing)
 
     # ------------------------------------------------------------------
     # 1) QA PROMPT (Quick check)
     # ------------------------------------------------------------------
-    async def run_qa_analysis(self, image_data: bytes, pet_type: str, mime_type: str = "image/jpeg") -> Dict[str, Any]:
+    async def run_qa_analysis(self, image_data: bytes, pet_type: str, mime_type: str = "image/jpeg") -> QAResult:
         prompt = f"""
 Role: Senior Veterinary Doctor and Pet Health Screening AI.
 
@@ -110,18 +425,32 @@ Task: Perform a quick visual QA check.
 2. Identify the pet type (dog, cat, bird, fish, rabbit, etc).
 3. Compare with user claim: "{pet_type}".
 4. Decide if the pet looks healthy.
-5. If unhealthy, name the suspected condition briefly.
+5. If unhealthy, name the suspected condition briefly and rate its severity
+   (mild, moderate, severe, critical); otherwise leave both empty.
+6. Rate your confidence in this assessment from 0 to 1.
 
 STRICT JSON ONLY:
 {{
   "is_valid_pet": true/false,
   "detected_pet": "",
   "is_healthy": true/false,
-  "suspected_condition": "" 
+  "suspected_condition": "",
+  "severity": "",
+  "confidence": 0.0
 }}
 """
-        text = await self._generate_with_retry(prompt, image_data, mime_type=mime_type)
-        return self._parse_json(text)
+        return await self._generate_cascade(
+            prompt, image_data, prompt_type="qa", schema=QAResult, mime_type=mime_type, assess=self._assess_qa
+        )
+
+    @staticmethod
+    def _assess_qa(qa: Any) -> Optional[str]:
+        """Reason to escalate a QA (or combined) answer to a heavier model, if any."""
+        if qa.is_valid_pet and not qa.is_healthy:
+            return "unhealthy"
+        if qa.confidence is not None and qa.confidence < settings.CASCADE_MIN_CONFIDENCE:
+            return "low_confidence"
+        return None
 
     # ------------------------------------------------------------------
     # 2) FULL DIAGNOSTIC PROMPT
@@ -132,7 +461,7 @@ STRICT JSON ONLY:
         pet_name: str,
         lang_target: str = "English",
         mime_type: str = "image/jpeg"
-    ) -> Dict[str, Any]:
+    ) -> DiagnosticAnalysis:
         prompt = f"""
 Role: You are an expert Veterinary Disease Specialist and Animal Health Advisory System.
 
@@ -176,14 +505,20 @@ JSON FORMAT:
   }}
 }}
 """
-        # Prefer fallback/pro if you want heavier reasoning, but you can keep primary too.
-        text = await self._generate_with_retry(prompt, image_data, mime_type=mime_type, use_fallback=True, retries=2)
-        return self._parse_json(text)
+        # Healthy results stay on the cheap tier; a detected disease escalates to a heavier model
+        return await self._generate_cascade(
+            prompt,
+            image_data,
+            prompt_type="diagnostic",
+            schema=DiagnosticAnalysis,
+            mime_type=mime_type,
+            assess=lambda r: "unhealthy" if r.disease_info.common_name else None,
+        )
 
     # ------------------------------------------------------------------
     # 3) BOUNDING BOX PROMPT (JSON coordinates)
     # ------------------------------------------------------------------
-    async def generate_bounding_boxes(self, image_data: bytes, mime_type: str = "image/jpeg") -> Dict[str, Any]:
+    async def generate_bounding_boxes(self, image_data: bytes, mime_type: str = "image/jpeg") -> BoundingBoxes:
         prompt = """
 You are a computer vision analysis system specialized in veterinary image assessment.
 
@@ -215,8 +550,9 @@ Return ONLY valid JSON:
   ]
 }
 """
-        text = await self._generate_with_retry(prompt, image_data, mime_type=mime_type)
-        return self._parse_json(text)
+        return await self._generate_cascade(
+            prompt, image_data, prompt_type="bbox", schema=BoundingBoxes, mime_type=mime_type
+        )
 
     # ------------------------------------------------------------------
     # 4) FULL DIAGNOSTIC TEXT PROMPT (NEW)
@@ -225,12 +561,25 @@ Return ONLY valid JSON:
         self,
         pet_name: str,
         disease_name: str,
-        lang_target: str = "English"
-    ) -> Dict[str, Any]:
+        lang_target: str = "English",
+        use_cache: bool = True,
+    ) -> FullDiagnosis:
         """
         Generates a full textual diagnosis based on the detected pet and disease.
-        No image needed for this textual expansion.
+        No image needed for this textual expansion. Results are shared through the cache backend
+        unless `use_cache` is False (e.g. when building the diagnosis catalog).
         """
+        if not use_cache:
+            return await self._generate_full_diagnosis(pet_name, disease_name, lang_target)
+
+        async def generate():
+            return (await self._generate_full_diagnosis(pet_name, disease_name, lang_target)).model_dump()
+
+        key = f"{pet_name.lower()}|{disease_name.lower()}|{lang_target.lower()}"
+        data = await get_or_set_json("diagnosis", key, generate, ttl=settings.DIAGNOSIS_CACHE_TTL)
+        return FullDiagnosis.model_validate(data)
+
+    async def _generate_full_diagnosis(self, pet_name: str, disease_name: str, lang_target: str) -> FullDiagnosis:
         prompt = f"""
 Role: Expert Veterinary Health Assistant.
 
@@ -251,21 +600,67 @@ JSON Format:
   "disclaimer": "This is AI-generated and not a substitute for professional veterinary advice."
 }}
 """
-        # We use a simple generate call without image here
-        client = self.client
-        loop = asyncio.get_running_loop()
-        resp = await loop.run_in_executor(
-            None,
-            lambda: client.models.generate_content(
-                model=self.primary_model,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.7,
-                    response_mime_type="application/json",
-                ),
-            ),
+        # Text-only prompt, no image needed
+        return await self._generate_cascade(
+            prompt, None, prompt_type="text_diagnosis", schema=FullDiagnosis, temperature=0.7
+        )
+
+    # ------------------------------------------------------------------
+    # 5) COMBINED PROMPT (QA + BOUNDING BOXES + DIAGNOSIS in one call)
+    # ------------------------------------------------------------------
+    async def run_combined_analysis(
+        self,
+        image_data: bytes,
+        pet_type: str,
+        lang_target: str = "English",
+        mime_type: str = "image/jpeg"
+    ) -> CombinedAnalysis:
+        """
+        One structured-output call (one image upload) instead of the QA, bounding box
+        and diagnosis prompts. Use `split_combined` to map it to the PetScan.result shape.
+        """
+        prompt = f"""
+Role: Senior Veterinary Doctor and Veterinary Computer Vision System.
+
+Task: Analyze the attached pet image in a single pass.
+
+1. QA CHECK
+   - Verify whether a pet animal is present and identify its type (dog, cat, bird, fish, rabbit, etc).
+   - Compare with user claim: "{pet_type}".
+   - Decide if the pet looks healthy. If unhealthy, name the suspected condition briefly
+     and rate its severity (mild, moderate, severe, critical); otherwise leave both empty.
+   - Rate your confidence in this assessment from 0 to 1.
+
+2. AFFECTED AREAS
+   - Draw a tight bounding box for EACH distinct visibly affected area
+     (wound, rash, swelling, infection, redness, hair loss, parasites).
+   - Do NOT group areas, do NOT hallucinate boxes; return an empty list if none are visible.
+   - Coordinates on a 0 to 1000 scale, format [ymin, xmin, ymax, xmax].
+
+3. DIAGNOSIS
+   - Only if the pet is unhealthy: an overview of the condition, common symptoms, general
+     treatment, home care tips, when to visit a vet and a disclaimer, written in {lang_target}.
+   - If the pet is healthy or no pet is present, set "diagnosis" to null.
+
+Return JSON matching the response schema. JSON keys stay in English.
+"""
+        return await self._generate_cascade(
+            prompt,
+            image_data,
+            prompt_type="combined",
+            schema=CombinedAnalysis,
+            mime_type=mime_type,
+            assess=self._assess_qa,
+        )
+
+    @staticmethod
+    def split_combined(combined: CombinedAnalysis) -> ScanResult:
+        """Map a combined answer to the PetScan.result shape (`qa`, `bboxes`, `diagnosis`)."""
+        return ScanResult(
+            qa=combined.model_dump(exclude={"detections", "diagnosis"}),
+            bboxes=[detection.model_dump() for detection in combined.detections],
+            diagnosis=combined.diagnosis,
         )
-        return self._parse_json(resp.text)
 
 
 gemini_service = GeminiService()
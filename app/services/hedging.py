@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.config.settings import settings
+from app.services.routing import RollingStats
+
+
+class HedgePolicy:
+    """
+    Decides when a slow Gemini call gets a duplicate ("hedge") request.
+
+    The hedge delay adapts to the rolling latency percentile of each prompt type,
+    and the share of hedged calls within the window is capped at `max_rate`
+    so the extra cost stays bounded.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        percentile: float,
+        min_delay: float,
+        max_rate: float,
+        min_samples: int,
+        window_seconds: float,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.window_seconds = window_seconds
+        self._latency: Dict[str, RollingStats] = {}
+        self._calls: Deque[float] = deque()
+        self._hedges: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _stats(self, prompt_type: str) -> RollingStats:
+        stats = self._latency.get(prompt_type)
+        if stats is None:
+            stats = self._latency.setdefault(prompt_type, RollingStats(self.window_seconds))
+        return stats
+
+    def record(self, prompt_type: str, latency: float) -> None:
+        """Record the latency of a successful call."""
+        self._stats(prompt_type).record(latency, True)
+
+    def delay(self, prompt_type: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        stats = self._stats(prompt_type)
+        if stats.count() < self.min_samples:
+            return None
+        return max(self.min_delay, stats.percentile(self.percentile) or 0.0)
+
+    def _prune(self, queue: Deque[float], now: float) -> None:
+        cutoff = now - self.window_seconds
+        while queue and queue[0] < cutoff:
+            queue.popleft()
+
+    def note_call(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._calls.append(now)
+            self._prune(self._calls, now)
+
+    def try_acquire(self) -> bool:
+        """Reserve a hedge if the hedge rate is still under the cap."""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(self._calls, now)
+            self._prune(self._hedges, now)
+            if len(self._hedges) + 1 > self.max_rate * max(len(self._calls), 1):
+                return False
+            self._hedges.append(now)
+            return True
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            prompt_type: {"samples": stats.count(), "hedge_delay": self.delay(prompt_type)}
+            for prompt_type, stats in self._latency.items()
+        }
+
+
+hedge_policy = HedgePolicy(
+    enabled=settings.HEDGE_ENABLED,
+    percentile=settings.HEDGE_PERCENTILE,
+    min_delay=settings.HEDGE_MIN_DELAY,
+    max_rate=settings.HEDGE_MAX_RATE,
+    min_samples=settings.HEDGE_MIN_SAMPLES,
+    window_seconds=settings.HEDGE_WINDOW_SECONDS,
+)
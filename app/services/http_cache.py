@@ -0,0 +1,77 @@
+"""
+HTTP validators for read endpoints.
+
+Routes set a strong ETag and a Cache-Control policy, and answer 304 when the
+request's If-None-Match already holds the current ETag. The ETag is computed
+from something cheaper than the body:
+
+- scans:  the scan id, its pet_id and the result hash stored with the scan (pet_scans.result_hash),
+- KB:     the "kb" version counter that every KB write bumps,
+- stats:  the scan count and the latest created_at.
+
+`conditional` raises a 304 HTTPException, so it also works inside dependencies
+that run before the route loads anything. The compression middleware appends
+"-gzip"/"-br" to the ETag of compressed bodies; matching ignores that suffix.
+"""
+import hashlib
+import os
+import time
+from typing import Any, Optional
+
+import orjson
+from fastapi import HTTPException, Request, Response
+
+from app.services.cache import MemoryCache, cache, get_version
+
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+# Memory-cache version counters restart at 0 with every process; keep their ETags apart
+_BOOT_ID = f"{os.getpid()}.{time.time_ns()}"
+
+
+def content_hash(data: Any) -> str:
+    """Stable hash of a JSON-compatible value."""
+    return hashlib.sha256(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()[:32]
+
+
+def etag(*parts: Any) -> str:
+    return '"' + hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32] + '"'
+
+
+async def version_etag(name: str) -> str:
+    """ETag for data guarded by a cache version counter (e.g. the KB)."""
+    version = await get_version(name)
+    if isinstance(cache, MemoryCache):
+        return etag(name, version, _BOOT_ID)
+    return etag(name, version)
+
+
+def policy(max_age: int) -> str:
+    return f"private, max-age={max_age}" if max_age > 0 else "no-cache"
+
+
+def _strip(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[: -len(suffix) - 1] + '"'
+    return tag
+
+
+def if_none_match(request: Request, current: str) -> bool:
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_strip(tag) == current for tag in header.split(","))
+
+
+def conditional(request: Request, response: Response, current: str, cache_control: str) -> None:
+    """Set the validators on `response`; raise a 304 if the client's copy is current."""
+    headers = {"ETag": current, "Cache-Control": cache_control}
+    if if_none_match(request, current):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
@@ -0,0 +1,151 @@
+"""
+Idempotency-Key support for scan submission.
+
+The first request with a key inserts an `in_progress` row and runs the scan.
+Retries with the same key wait for it (an in-process event for the same worker,
+polling the table otherwise) and replay the stored response. A failed request
+releases its key so a retry runs the scan again.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config.settings import settings
+from app.models.idempotency import IdempotencyKey
+from app.utils.db_init import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.25
+
+
+class IdempotencyError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class Claim:
+    key: str
+    # Stored response to replay; None when this request owns the key
+    response: Optional[Any] = None
+    status_code: int = 200
+
+
+def fingerprint(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+class IdempotencyService:
+    def __init__(self):
+        self._local: Dict[str, asyncio.Event] = {}
+
+    async def _try_claim(self, key: str, request_fingerprint: str) -> Optional[IdempotencyKey]:
+        """Insert an in_progress row; returns the existing row if the key is taken."""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            session.add(IdempotencyKey(
+                key=key,
+                fingerprint=request_fingerprint,
+                status="in_progress",
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+            ))
+            try:
+                await session.commit()
+                return None
+            except IntegrityError:
+                await session.rollback()
+
+            existing = await session.get(IdempotencyKey, key)
+            if existing is not None and existing.expires_at <= now:
+                # Replay TTL elapsed, or the owner died while in progress
+                await session.execute(
+                    delete(IdempotencyKey).where(
+                        IdempotencyKey.key == key, IdempotencyKey.expires_at <= now
+                    )
+                )
+                await session.commit()
+                return await self._try_claim(key, request_fingerprint)
+            return existing
+
+    async def begin(self, key: str, request_fingerprint: str) -> Claim:
+        """Claim `key`, or wait for its owner and return the stored response."""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            existing = await self._try_claim(key, request_fingerprint)
+            if existing is None:
+                self._local[key] = asyncio.Event()
+                return Claim(key=key)
+            if existing.fingerprint != request_fingerprint:
+                raise IdempotencyError(422, "Idempotency-Key was already used with a different request.")
+            if existing.status == "completed":
+                logger.info(f"Replaying stored response for idempotency key {key}")
+                return Claim(key=key, response=existing.response, status_code=existing.status_code or 200)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise IdempotencyError(409, "A request with this Idempotency-Key is still in progress.")
+            event = self._local.get(key)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(POLL_INTERVAL, remaining))
+
+    async def complete(self, claim: Claim, response: Any, status_code: int = 200) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key == claim.key)
+                    .values(
+                        status="completed",
+                        status_code=status_code,
+                        response=response,
+                        expires_at=datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL),
+                    )
+                )
+                await session.commit()
+        finally:
+            self._wake(claim.key)
+
+    async def release(self, claim: Claim) -> None:
+        """Forget a failed request so that a retry runs it again."""
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(delete(IdempotencyKey).where(IdempotencyKey.key == claim.key))
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key {claim.key}: {e}")
+        finally:
+            self._wake(claim.key)
+
+    def _wake(self, key: str) -> None:
+        event = self._local.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def purge_expired(self) -> int:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+            )
+            await session.commit()
+            return result.rowcount or 0
+
+
+idempotency_service = IdempotencyService()
@@ -1,37 +1,248 @@
-import pandas as pd
-import os
+"""
+Knowledge base bulk import/export.
+
+The `pet_kb` table is the only copy of the KB. Imports stream CSV or JSONL
+(columns pet_name, disease_name, treatment) and upsert them in batches on
+(pet_name, disease_name); rows whose treatment is unchanged are not written.
+The bundled knowledge_base/pet_kb.csv is synced into the table at startup
+whenever its checksum changes.
+
+The upsert needs the unique index on (pet_name, disease_name) (migration 0004).
+If it can't be created because the table holds duplicates, the KB is written
+with plain UPDATE/INSERT statements until the duplicates are removed.
+
+    python -m app.services.knowledge import entries.jsonl
+    python -m app.services.knowledge export --format csv > pet_kb.csv
+    python -m app.services.knowledge sync
+"""
+import asyncio
+import csv
+import hashlib
+import io
+import json
 import logging
-from typing import List
+import os
+from itertools import islice
+from typing import AsyncIterator, Dict, Iterator, List, Optional, TextIO
+
+from sqlalchemy import insert, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.models.app_meta import AppMeta
+from app.models.pet_kb import PetKB
+from app.services.cache import bump_version
+from app.utils.db_init import AsyncSessionLocal
 
 logger = logging.getLogger(__name__)
 
+FIELDS = ("pet_name", "disease_name", "treatment")
+FORMATS = ("csv", "jsonl")
+CHECKSUM_KEY = "kb_csv_checksum"
+
+
+def detect_format(filename: Optional[str], explicit: Optional[str] = None) -> str:
+    if explicit:
+        return explicit
+    if filename and filename.lower().endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def parse_rows(stream: TextIO, fmt: str) -> Iterator[Optional[dict]]:
+    """Yield raw rows from a text stream; malformed JSON lines yield None."""
+    if fmt == "jsonl":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+    else:
+        yield from csv.DictReader(stream)
+
+
+def _take_batch(rows: Iterator[Optional[dict]], size: int, stats: Dict[str, int]) -> List[dict]:
+    """Next batch of valid rows, deduplicated on (pet_name, disease_name) with the last row winning."""
+    batch: Dict[tuple, dict] = {}
+    for raw in islice(rows, size):
+        stats["received"] += 1
+        if not isinstance(raw, dict):
+            stats["invalid"] += 1
+            continue
+        row = {field: str(raw.get(field) or "").strip() for field in FIELDS}
+        if not all(row.values()):
+            stats["invalid"] += 1
+            continue
+        batch[(row["pet_name"], row["disease_name"])] = row
+    return list(batch.values())
+
+
 class KnowledgeBaseService:
-    def __init__(self, csv_path: str = "knowledge_base/pet_kb.csv"):
+    def __init__(self, csv_path: str = settings.KB_CSV_PATH):
         self.csv_path = csv_path
-        self.df = None
-        self._load_kb()
+        self._unique_index: Optional[bool] = None
 
-    def _load_kb(self):
-        try:
-            if os.path.exists(self.csv_path):
-                self.df = pd.read_csv(self.csv_path)
+    @staticmethod
+    def _upsert_statement(dialect: str):
+        insert_ = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert_(PetKB)
+        # RETURNING yields exactly the inserted or changed rows; executemany rowcount is -1 on asyncpg
+        return stmt.on_conflict_do_update(
+            index_elements=[PetKB.pet_name, PetKB.disease_name],
+            set_={"treatment": stmt.excluded.treatment},
+            where=PetKB.treatment != stmt.excluded.treatment,
+        ).returning(PetKB.id)
+
+    async def _ensure_unique_index(self, session: AsyncSession) -> bool:
+        """Create the upsert's unique index if missing; False if duplicates prevent it."""
+        if self._unique_index is None:
+            try:
+                async with session.begin_nested():
+                    # Tables created before the unique index existed (see migration 0004)
+                    await session.execute(text(
+                        "CREATE UNIQUE INDEX IF NOT EXISTS uq_pet_kb_pet_disease ON pet_kb (pet_name, disease_name)"
+                    ))
+                self._unique_index = True
+            except IntegrityError as e:
+                logger.error(
+                    f"pet_kb has duplicate (pet_name, disease_name) rows, so KB imports fall back "
+                    f"to plain UPDATE/INSERT; run `alembic upgrade head` to remove them: {e}"
+                )
+                self._unique_index = False
+        return self._unique_index
+
+    @staticmethod
+    async def _write_plain(conn, batch: List[dict]) -> int:
+        """Upsert without ON CONFLICT, for tables that still hold duplicate keys."""
+        result = await conn.execute(
+            select(PetKB.pet_name, PetKB.disease_name, PetKB.treatment).where(
+                tuple_(PetKB.pet_name, PetKB.disease_name).in_([(r["pet_name"], r["disease_name"]) for r in batch])
+            )
+        )
+        existing: Dict[tuple, set] = {}
+        for pet_name, disease_name, treatment in result:
+            existing.setdefault((pet_name, disease_name), set()).add(treatment)
+
+        written = 0
+        missing = [row for row in batch if (row["pet_name"], row["disease_name"]) not in existing]
+        if missing:
+            await conn.execute(insert(PetKB), missing)
+            written += len(missing)
+        for row in batch:
+            treatments = existing.get((row["pet_name"], row["disease_name"]))
+            if treatments and treatments != {row["treatment"]}:
+                await conn.execute(
+                    update(PetKB)
+                    .where(PetKB.pet_name == row["pet_name"], PetKB.disease_name == row["disease_name"])
+                    .values(treatment=row["treatment"])
+                )
+                written += 1
+        return written
+
+    async def _import(self, session: AsyncSession, stream: TextIO, fmt: str) -> Dict[str, int]:
+        stats = {"received": 0, "written": 0, "invalid": 0}
+        upsert = await self._ensure_unique_index(session)
+        conn = await session.connection()
+        stmt = self._upsert_statement(conn.dialect.name)
+        rows = parse_rows(stream, fmt)
+        while True:
+            # Parsing reads the (spooled) file, so keep it off the event loop
+            batch = await asyncio.to_thread(_take_batch, rows, settings.KB_IMPORT_BATCH_SIZE, stats)
+            if not batch:
+                return stats
+            if upsert:
+                result = await conn.execute(stmt, batch)
+                stats["written"] += len(result.all())
             else:
-                logger.warning(f"KB CSV not found at {self.csv_path}")
-                self.df = pd.DataFrame(columns=["pet_type", "disease_name", "additional_guidance"])
-        except Exception as e:
-            logger.error(f"Error loading KB: {e}")
-            self.df = pd.DataFrame(columns=["pet_type", "disease_name", "additional_guidance"])
-
-    def get_suggestions(self, pet_type: str, disease_name: str) -> List[str]:
-        if self.df is None or self.df.empty:
-            return []
-        
-        # Simple fuzzy match or exact match
-        matches = self.df[
-            (self.df['pet_type'].str.contains(pet_type, case=False, na=False)) & 
-            (self.df['disease_name'].str.contains(disease_name, case=False, na=False))
-        ]
-        
-        return matches['additional_guidance'].tolist()
+                stats["written"] += await self._write_plain(conn, batch)
+
+    async def import_stream(self, session: AsyncSession, stream: TextIO, fmt: str) -> Dict[str, int]:
+        """Upsert every row of `stream` in one transaction."""
+        stats = await self._import(session, stream, fmt)
+        await session.commit()
+        if stats["written"]:
+            await bump_version("kb")
+        logger.info(f"KB import ({fmt}): {stats}")
+        return stats
+
+    async def export(self, fmt: str = "csv") -> AsyncIterator[str]:
+        """Stream the whole KB; uses its own session so it can outlive the request scope."""
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                select(PetKB.pet_name, PetKB.disease_name, PetKB.treatment)
+                .order_by(PetKB.id)
+                .execution_options(yield_per=settings.KB_IMPORT_BATCH_SIZE)
+            )
+            if fmt == "csv":
+                yield ",".join(FIELDS) + "\n"
+            async for partition in result.partitions():
+                buffer = io.StringIO()
+                if fmt == "csv":
+                    csv.writer(buffer, lineterminator="\n").writerows(partition)
+                else:
+                    for row in partition:
+                        buffer.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n")
+                yield buffer.getvalue()
+
+    async def sync_bundled_csv(self) -> Optional[Dict[str, int]]:
+        """Upsert the bundled CSV into pet_kb if it changed since the last sync."""
+        if not os.path.exists(self.csv_path):
+            logger.warning(f"KB CSV not found at {self.csv_path}")
+            return None
+        with open(self.csv_path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+
+        async with AsyncSessionLocal() as session:
+            stored = await session.get(AppMeta, CHECKSUM_KEY)
+            if stored is not None and stored.value == checksum:
+                return None
+            with open(self.csv_path, encoding="utf-8-sig", newline="") as f:
+                stats = await self._import(session, f, "csv")
+            await session.merge(AppMeta(key=CHECKSUM_KEY, value=checksum))
+            await session.commit()
+        if stats["written"]:
+            await bump_version("kb")
+        logger.info(f"Synced {self.csv_path} into pet_kb: {stats}")
+        return stats
+
 
 kb_service = KnowledgeBaseService()
+
+
+async def _cli(args) -> None:
+    from app.main import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        if args.command == "sync":
+            print(await kb_service.sync_bundled_csv() or "Bundled KB CSV unchanged.")
+        elif args.command == "import":
+            fmt = detect_format(args.path, args.format)
+            with open(args.path, encoding="utf-8-sig", newline="") as f:
+                async with AsyncSessionLocal() as session:
+                    print(await kb_service.import_stream(session, f, fmt))
+        else:
+            async for chunk in kb_service.export(args.format or "csv"):
+                print(chunk, end="")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Knowledge base bulk tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Upsert a CSV or JSONL file into pet_kb")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=FORMATS)
+    exp = sub.add_parser("export", help="Write pet_kb to stdout")
+    exp.add_argument("--format", choices=FORMATS)
+    sub.add_parser("sync", help="Sync the bundled KB CSV if it changed")
+    asyncio.run(_cli(parser.parse_args()))
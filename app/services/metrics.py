@@ -0,0 +1,154 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Latency buckets tuned for remote model calls (tens of ms up to a minute)
+MODEL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 34, 60)
+# Latency buckets for local work (file reads, DB round trips)
+LOCAL_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+SCAN_STAGES = ("upload_read", "qa", "bbox", "combined", "db_commit")
+
+SCAN_STAGE_SECONDS = Histogram(
+    "petscan_stage_seconds",
+    "Latency of each stage of the scan_pet pipeline.",
+    ["stage"],
+    buckets=MODEL_BUCKETS,
+)
+GEMINI_CALL_SECONDS = Histogram(
+    "gemini_call_seconds",
+    "Latency of a single Gemini generate_content call.",
+    ["model", "prompt_type"],
+    buckets=MODEL_BUCKETS,
+)
+GEMINI_CALL_ERRORS = Counter(
+    "gemini_call_errors_total",
+    "Failed Gemini calls by model, prompt type and exception class.",
+    ["model", "prompt_type", "error"],
+)
+GEMINI_RETRIES = Counter(
+    "gemini_retries_total",
+    "Gemini calls retried after a failed attempt.",
+    ["model", "prompt_type"],
+)
+GEMINI_FALLBACKS = Counter(
+    "gemini_fallback_activations_total",
+    "Times a prompt switched to the fallback model.",
+    ["prompt_type"],
+)
+GEMINI_ESCALATIONS = Counter(
+    "gemini_cascade_escalations_total",
+    "Cascade escalations to a heavier model, by prompt type and reason.",
+    ["prompt_type", "from_model", "reason"],
+)
+GEMINI_REPAIRS = Counter(
+    "gemini_field_repairs_total",
+    "Malformed answer fields repaired locally (default/drop_items) or re-requested (retry).",
+    ["prompt_type", "field", "action"],
+)
+GEMINI_HEDGES = Counter(
+    "gemini_hedges_total",
+    "Hedged Gemini calls by prompt type and outcome (primary_won/hedge_won/failed/capped).",
+    ["prompt_type", "outcome"],
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the DB pool.",
+    buckets=LOCAL_BUCKETS,
+)
+PREFILTER_DECISIONS = Counter(
+    "prefilter_decisions_total",
+    "Local pre-filter outcomes (reject/pass/error, or agree/disagree with Gemini in shadow mode).",
+    ["mode", "outcome"],
+)
+PREFILTER_SECONDS = Histogram(
+    "prefilter_seconds",
+    "Latency of the local pre-filter, including the process pool hop.",
+    buckets=LOCAL_BUCKETS,
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot, by priority class.",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds",
+    "Time spent waiting for an admission slot, by priority class.",
+    ["priority"],
+    buckets=MODEL_BUCKETS,
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests rejected with 429 by priority class and reason.",
+    ["priority", "reason"],
+)
+REQUEST_ABORTS = Counter(
+    "request_aborts_total",
+    "Requests abandoned because the client disconnected or the deadline passed, by route.",
+    ["route", "reason"],
+)
+GEMINI_DEADLINE_SKIPS = Counter(
+    "gemini_deadline_skips_total",
+    "Retries, fallbacks and cascade escalations skipped because the request deadline could not cover them.",
+    ["prompt_type", "step"],
+)
+SCAN_GROUP_COMMIT_SIZE = Histogram(
+    "scan_group_commit_rows",
+    "Scans written per group-commit transaction.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    ["cache", "result"],
+)
+
+# Bind the fixed-label children once so the hot path skips the labels() lookup lock
+_STAGE_CHILDREN = {stage: SCAN_STAGE_SECONDS.labels(stage=stage) for stage in SCAN_STAGES}
+
+
+@contextmanager
+def scan_stage(stage: str):
+    """Time one stage of the scan pipeline."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STAGE_CHILDREN[stage].observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+    With PROMETHEUS_MULTIPROC_DIR set (multi-worker mode) the values of every
+    worker process are aggregated from the shared directory.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop live gauges of the exiting worker in multi-worker mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,221 @@
+"""
+Monthly partition maintenance and retention for `pet_scans` (PostgreSQL only).
+
+Migration 0001 turns `pet_scans` into a table range-partitioned on created_at
+with one partition per month (pet_scans_y2026m01, ...) and a default partition.
+Queries filtering on created_at only scan the matching months.
+
+- ensure:    create the partitions for this month and SCAN_PARTITION_MONTHS_AHEAD
+             months ahead (also run at startup). Rows of that month already in the
+             default partition are moved into the new partition.
+- retention: archive partitions older than SCAN_RETENTION_MONTHS to gzipped NDJSON
+             (SCAN_ARCHIVE_DIR, uploaded to SCAN_ARCHIVE_S3_BUCKET when set), then
+             detach or drop them (SCAN_RETENTION_ACTION).
+
+    python -m app.services.partitions ensure --months-ahead 3
+    python -m app.services.partitions retention --keep-months 12 --action drop
+"""
+import asyncio
+import gzip
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config.settings import settings
+from app.utils.db_init import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT = "pet_scans"
+DEFAULT_PARTITION = f"{PARENT}_default"
+_NAME_RE = re.compile(rf"^{PARENT}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    years, month = divmod(value.month - 1 + months, 12)
+    return datetime(value.year + years, month + 1, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT}_y{start.year}m{start.month:02d}"
+
+
+def partition_ddl(start: datetime) -> str:
+    end = add_months(start, 1)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    )
+
+
+@dataclass
+class Partition:
+    name: str
+    start: datetime
+
+    @property
+    def end(self) -> datetime:
+        return add_months(self.start, 1)
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = await conn.scalar(text(
+        # relkind is a "char"; asyncpg would return it as bytes
+        "SELECT relkind::text FROM pg_class WHERE relname = :name AND pg_table_is_visible(oid)"
+    ), {"name": PARENT})
+    return relkind == "p"
+
+
+async def list_partitions(conn: AsyncConnection) -> List[Partition]:
+    """Monthly partitions of pet_scans, oldest first (the default partition is not listed)."""
+    rows = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name"
+    ), {"name": PARENT})
+    partitions = []
+    for (name,) in rows:
+        match = _NAME_RE.match(name)
+        if match:
+            partitions.append(Partition(name, datetime(int(match[1]), int(match[2]), 1)))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+async def _create_partition(conn: AsyncConnection, month: datetime, has_default: bool) -> None:
+    """
+    Create a month's partition. PostgreSQL refuses to while the default partition
+    holds rows of that month, so those are moved over within the same transaction:
+    detach the default, create the partition, copy the rows in, delete them from
+    the default and attach it again.
+    """
+    end = add_months(month, 1)
+    bounds = {"start": month, "end": end}
+    in_month = "created_at >= :start AND created_at < :end"
+    if not has_default or not await conn.scalar(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})"), bounds
+    ):
+        await conn.execute(text(partition_ddl(month)))
+        return
+
+    name = partition_name(month)
+    await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}"))
+    await conn.execute(text(partition_ddl(month)))
+    moved = await conn.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+    await conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"), bounds)
+    await conn.execute(text(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.info(f"Moved {moved.rowcount} rows from {DEFAULT_PARTITION} into {name}")
+
+
+async def ensure_partitions(months_ahead: Optional[int] = None) -> List[str]:
+    """Create missing monthly partitions from this month on; no-op unless pet_scans is partitioned."""
+    months_ahead = settings.SCAN_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    async with engine.begin() as conn:
+        if not await is_partitioned(conn):
+            return []
+        existing = {p.name for p in await list_partitions(conn)}
+        has_default = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION})
+        created = []
+        start = month_start(datetime.utcnow())
+        for offset in range(months_ahead + 1):
+            month = add_months(start, offset)
+            if partition_name(month) not in existing:
+                await _create_partition(conn, month, has_default)
+                created.append(partition_name(month))
+    if created:
+        logger.info(f"Created scan partitions: {', '.join(created)}")
+    return created
+
+
+async def _archive(conn: AsyncConnection, partition: Partition) -> str:
+    """Write every row of a partition to a gzipped NDJSON file; returns its path."""
+    os.makedirs(settings.SCAN_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(settings.SCAN_ARCHIVE_DIR, f"{partition.name}.ndjson.gz")
+    expected = await conn.scalar(text(f"SELECT count(*) FROM {partition.name}"))
+
+    written = 0
+    with gzip.open(path + ".tmp", "wb") as f:
+        result = await conn.stream(
+            text(f"SELECT * FROM {partition.name} ORDER BY created_at"),
+        )
+        async for rows in result.mappings().partitions(settings.SCAN_EXPORT_BATCH_SIZE):
+            chunk = b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+            await asyncio.to_thread(f.write, chunk)
+            written += len(rows)
+    if written != expected:
+        os.remove(path + ".tmp")
+        raise RuntimeError(f"Archived {written} of {expected} rows from {partition.name}")
+    os.replace(path + ".tmp", path)
+
+    if settings.SCAN_ARCHIVE_S3_BUCKET:
+        from app.services.s3 import s3_service
+
+        await asyncio.to_thread(s3_service.upload_archive, path, f"pet_scans/{os.path.basename(path)}")
+    return path
+
+
+async def apply_retention(keep_months: Optional[int] = None, action: Optional[str] = None) -> List[str]:
+    """Archive, then detach or drop, partitions that ended more than `keep_months` months ago."""
+    keep_months = settings.SCAN_RETENTION_MONTHS if keep_months is None else keep_months
+    action = action or settings.SCAN_RETENTION_ACTION
+    if keep_months <= 0:
+        return []
+    cutoff = add_months(month_start(datetime.utcnow()), -keep_months)
+
+    async with engine.connect() as conn:
+        if not await is_partitioned(conn):
+            logger.warning("pet_scans is not partitioned; run the migrations on PostgreSQL first.")
+            return []
+        expired = [p for p in await list_partitions(conn) if p.end <= cutoff]
+
+    done = []
+    for partition in expired:
+        async with engine.begin() as conn:
+            path = await _archive(conn, partition)
+            await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {partition.name}"))
+            if action == "drop":
+                await conn.execute(text(f"DROP TABLE {partition.name}"))
+        logger.info(f"Archived {partition.name} to {path} and {action}ed it")
+        done.append(partition.name)
+    return done
+
+
+async def _cli(args) -> None:
+    try:
+        if args.command == "ensure":
+            print(await ensure_partitions(args.months_ahead) or "All partitions exist.")
+        elif args.command == "retention":
+            print(await apply_retention(args.keep_months, args.action) or "Nothing to archive.")
+        else:
+            async with engine.connect() as conn:
+                for partition in await list_partitions(conn):
+                    print(f"{partition.name}\t{partition.start:%Y-%m-%d}\t{partition.end:%Y-%m-%d}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="pet_scans partition maintenance (PostgreSQL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ensure = sub.add_parser("ensure", help="Create upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int)
+    retention = sub.add_parser("retention", help="Archive and detach/drop old partitions")
+    retention.add_argument("--keep-months", type=int)
+    retention.add_argument("--action", choices=("detach", "drop"))
+    sub.add_parser("list", help="List monthly partitions")
+    asyncio.run(_cli(parser.parse_args()))
@@ -0,0 +1,255 @@
+"""
+Local CPU pre-classifier that screens out obvious non-pet images
+(blank photos, screenshots, ...) before any Gemini call is made.
+
+Modes (PREFILTER_MODE):
+- off:     never runs.
+- shadow:  runs next to Gemini and only logs/counts agreement with its QA verdict.
+- enforce: runs first and short-circuits confident rejections.
+
+Backends (PREFILTER_BACKEND):
+- heuristic: colour/edge rules, no model file needed.
+- sklearn:   a joblib-pickled classifier with `predict_proba` over `extract_features`.
+- onnx:      an ONNX model taking a float32 [1, N_FEATURES] input and returning class probabilities.
+
+Train a scikit-learn model with:
+    python -m app.services.prefilter train --pets data/pets --others data/other --out prefilter.joblib
+"""
+import asyncio
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.config.settings import settings
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+N_FEATURES = 9
+_SIDE = 64
+
+# Per-process model cache for the pool workers
+_model: Any = None
+
+
+def extract_features(image_bytes: bytes) -> np.ndarray:
+    """Colour and edge statistics of a 64x64 thumbnail of the image."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        rgb = np.asarray(img.convert("RGB").resize((_SIDE, _SIDE)), dtype=np.float32)
+
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    # Colourfulness (Hasler & Suesstrunk)
+    rg, yb = r - g, 0.5 * (r + g) - b
+    colourfulness = np.hypot(rg.std(), yb.std()) + 0.3 * np.hypot(rg.mean(), yb.mean())
+
+    gy, gx = np.abs(np.diff(gray, axis=0)), np.abs(np.diff(gray, axis=1))
+    strong_x, strong_y = gx > 24, gy > 24
+    edge_density = (strong_x.mean() + strong_y.mean()) / 2
+    # Screenshots and UI have long straight edges: rows/columns where most pixels change together
+    axis_aligned = (strong_x.mean(axis=0) > 0.5).mean() + (strong_y.mean(axis=1) > 0.5).mean()
+
+    quantized = (rgb // 32).astype(np.int32)
+    codes = quantized[..., 0] * 64 + quantized[..., 1] * 8 + quantized[..., 2]
+    counts = np.bincount(codes.ravel(), minlength=512)
+    unique_ratio = (counts > 0).sum() / 512
+    dominant_ratio = counts.max() / codes.size
+
+    maxc, minc = rgb.max(axis=2), rgb.min(axis=2)
+    saturation = np.where(maxc > 0, (maxc - minc) / np.maximum(maxc, 1), 0).mean()
+    skin = ((r > 95) & (g > 40) & (b > 20) & (r > g) & (r > b) & (np.abs(r - g) > 15)).mean()
+
+    return np.array(
+        [gray.std() / 128, colourfulness / 128, edge_density, axis_aligned, unique_ratio,
+         dominant_ratio, saturation, skin, gray.mean() / 255],
+        dtype=np.float32,
+    )
+
+
+def _heuristic_pet_probability(features: np.ndarray) -> float:
+    contrast, colourfulness, edge_density, axis_aligned, unique_ratio, dominant_ratio = features[:6]
+    if contrast < 0.03 or dominant_ratio > 0.9:
+        return 0.01  # blank / single-colour image
+    if axis_aligned > 0.2 and dominant_ratio > 0.4:
+        return 0.05  # screenshot or UI capture
+    if unique_ratio < 0.02 and colourfulness < 0.05:
+        return 0.1  # document / line art
+    # Anything else could be a pet: stay uncertain and let Gemini decide
+    return 0.5
+
+
+def _load_model(backend: str, model_path: Optional[str]) -> Any:
+    global _model
+    if _model is None:
+        if backend == "sklearn":
+            import joblib
+
+            _model = joblib.load(model_path)
+        elif backend == "onnx":
+            import onnxruntime
+
+            _model = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+    return _model
+
+
+def score_image(image_bytes: bytes, backend: str, model_path: Optional[str]) -> float:
+    """Probability that the image shows a pet. Runs inside the process pool."""
+    features = extract_features(image_bytes)
+    if backend == "heuristic":
+        return _heuristic_pet_probability(features)
+
+    model = _load_model(backend, model_path)
+    if backend == "sklearn":
+        return float(model.predict_proba(features.reshape(1, -1))[0][1])
+    if backend == "onnx":
+        input_name = model.get_inputs()[0].name
+        outputs = model.run(None, {input_name: features.reshape(1, -1)})
+        probabilities = outputs[-1]
+        # skl2onnx classifiers return a list of {label: probability} dicts
+        if isinstance(probabilities, list) and isinstance(probabilities[0], dict):
+            return float(probabilities[0].get(1, 0.0))
+        return float(np.asarray(probabilities).reshape(-1)[-1])
+    raise ValueError(f"Unknown PREFILTER_BACKEND: {backend}")
+
+
+class PreFilterOutcome:
+    """Result of screening one image; `rejection` is set when the image can skip Gemini."""
+
+    def __init__(self, mode: str, rejection: Optional[Dict[str, Any]] = None, task: Optional[asyncio.Task] = None):
+        self.mode = mode
+        self.rejection = rejection
+        self._task = task
+
+    @property
+    def rejected(self) -> bool:
+        return self.rejection is not None
+
+    def observe(self, gemini_says_pet: bool) -> None:
+        """Shadow mode: compare the local verdict with Gemini's once both are known."""
+        if self._task is None:
+            return
+
+        def compare(task: asyncio.Task):
+            if task.cancelled() or task.exception() is not None:
+                return
+            pet_probability = task.result()
+            if pet_probability is None:
+                return
+            local_rejects = (1 - pet_probability) >= settings.PREFILTER_REJECT_THRESHOLD
+            agree = local_rejects != gemini_says_pet
+            metrics.PREFILTER_DECISIONS.labels(mode="shadow", outcome="agree" if agree else "disagree").inc()
+            if not agree:
+                logger.info(
+                    f"Prefilter shadow disagreement: pet_probability={pet_probability:.2f}, "
+                    f"gemini_is_valid_pet={gemini_says_pet}"
+                )
+
+        self._task.add_done_callback(compare)
+
+
+_PASS = PreFilterOutcome(mode="off")
+
+
+class PreFilterService:
+    def __init__(self):
+        self.mode = settings.PREFILTER_MODE
+        self.backend = settings.PREFILTER_BACKEND
+        self.model_path = settings.PREFILTER_MODEL_PATH
+        self.threshold = settings.PREFILTER_REJECT_THRESHOLD
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that already runs an event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.PREFILTER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    async def score(self, image_bytes: bytes) -> Optional[float]:
+        """Pet probability from the local model, or None if it could not be computed."""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(
+                self.pool, score_image, image_bytes, self.backend, self.model_path
+            )
+        except Exception as e:
+            logger.warning(f"Prefilter failed, deferring to Gemini: {e}")
+            metrics.PREFILTER_DECISIONS.labels(mode=self.mode, outcome="error").inc()
+            return None
+        finally:
+            metrics.PREFILTER_SECONDS.observe(time.perf_counter() - start)
+
+    async def screen(self, image_bytes: bytes) -> PreFilterOutcome:
+        if self.mode == "shadow":
+            return PreFilterOutcome(self.mode, task=asyncio.create_task(self.score(image_bytes)))
+        if self.mode != "enforce":
+            return _PASS
+
+        pet_probability = await self.score(image_bytes)
+        if pet_probability is None or (1 - pet_probability) < self.threshold:
+            metrics.PREFILTER_DECISIONS.labels(mode=self.mode, outcome="pass").inc()
+            return PreFilterOutcome(self.mode)
+
+        metrics.PREFILTER_DECISIONS.labels(mode=self.mode, outcome="reject").inc()
+        return PreFilterOutcome(self.mode, rejection={
+            "is_valid_pet": False,
+            "detected_pet": "None",
+            "is_healthy": True,
+            "suspected_condition": "",
+            "source": "prefilter",
+            "pet_probability": round(pet_probability, 3),
+        })
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+prefilter_service = PreFilterService()
+
+
+def _train(args) -> None:
+    """Fit a logistic regression on two folders of images and save it with joblib."""
+    import os
+
+    import joblib
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = [], []
+    for label, folder in ((1, args.pets), (0, args.others)):
+        for name in os.listdir(folder):
+            with open(os.path.join(folder, name), "rb") as f:
+                try:
+                    X.append(extract_features(f.read()))
+                    y.append(label)
+                except Exception as e:
+                    logger.warning(f"Skipping {name}: {e}")
+
+    model = LogisticRegression(max_iter=1000, class_weight="balanced").fit(np.stack(X), y)
+    joblib.dump(model, args.out)
+    print(f"Trained on {len(y)} images, training accuracy {model.score(np.stack(X), y):.3f}; saved to {args.out}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prefilter model tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Train a scikit-learn prefilter model")
+    train.add_argument("--pets", required=True, help="Folder of pet images")
+    train.add_argument("--others", required=True, help="Folder of non-pet images")
+    train.add_argument("--out", default="prefilter.joblib")
+    _train(parser.parse_args())
@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+
+
+class RollingStats:
+    """Latency and outcome samples of the last `window_seconds`."""
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._samples: Deque[Tuple[float, float, bool]] = deque()  # (timestamp, latency, ok)
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def record(self, latency: float, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._samples.append((now, latency, ok))
+            self._prune(now)
+
+    def count(self) -> int:
+        with self._lock:
+            self._prune(time.monotonic())
+            return len(self._samples)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            self._prune(time.monotonic())
+            if not self._samples:
+                return 0.0
+            return sum(1 for _, _, ok in self._samples if not ok) / len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile of the successful calls in the window."""
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(latency for _, latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))]
+
+
+class ModelRouter:
+    """
+    Picks the tiers of the configured model cascade (cheapest first) for each call,
+    skipping degraded models (high error rate or slow p90). The order stays cheap to
+    heavy, so an escalation never lands on a cheaper model than the one it leaves.
+    Samples expire after the window, so a degraded model gets retried later.
+    """
+
+    def __init__(
+        self,
+        cascade: List[str],
+        window_seconds: float,
+        max_error_rate: float,
+        max_p90_latency: float,
+        min_samples: int,
+    ):
+        self.cascade = cascade
+        self.max_error_rate = max_error_rate
+        self.max_p90_latency = max_p90_latency
+        self.min_samples = min_samples
+        self._stats: Dict[str, RollingStats] = {model: RollingStats(window_seconds) for model in cascade}
+        self._window_seconds = window_seconds
+
+    def _stats_for(self, model: str) -> RollingStats:
+        stats = self._stats.get(model)
+        if stats is None:
+            stats = self._stats.setdefault(model, RollingStats(self._window_seconds))
+        return stats
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        self._stats_for(model).record(latency, ok)
+
+    def is_degraded(self, model: str) -> bool:
+        stats = self._stats_for(model)
+        if stats.count() < self.min_samples:
+            return False
+        if stats.error_rate() > self.max_error_rate:
+            return True
+        p90 = stats.percentile(90)
+        return p90 is not None and p90 > self.max_p90_latency
+
+    def expected_latency(self, model: str) -> Optional[float]:
+        """Median latency of the model's recent successful calls."""
+        return self._stats_for(model).percentile(50)
+
+    def tiers(self) -> List[str]:
+        """Cascade for the next call: the healthy models, cheapest first (all of them if none is healthy)."""
+        healthy = [model for model in self.cascade if not self.is_degraded(model)]
+        return healthy or list(self.cascade)
+
+    def snapshot(self) -> List[Dict]:
+        return [
+            {
+                "model": model,
+                "samples": self._stats_for(model).count(),
+                "error_rate": round(self._stats_for(model).error_rate(), 3),
+                "p90_latency": self._stats_for(model).percentile(90),
+                "degraded": self.is_degraded(model),
+            }
+            for model in self.cascade
+        ]
+
+
+def _configured_cascade() -> List[str]:
+    models = [m.strip() for m in settings.GEMINI_MODEL_CASCADE.split(",") if m.strip()]
+    if not models:
+        models = [settings.GEMINI_MODEL_PRIMARY, settings.GEMINI_MODEL_FALLBACK]
+    # Keep order, drop duplicates (primary and fallback are often the same model)
+    return list(dict.fromkeys(models))
+
+
+model_router = ModelRouter(
+    cascade=_configured_cascade(),
+    window_seconds=settings.ROUTER_WINDOW_SECONDS,
+    max_error_rate=settings.ROUTER_MAX_ERROR_RATE,
+    max_p90_latency=settings.ROUTER_MAX_P90_LATENCY,
+    min_samples=settings.ROUTER_MIN_SAMPLES,
+)
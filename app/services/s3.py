@@ -49,4 +49,13 @@ class S3Service:
             logger.error(f"S3 BBOX Upload failed: {e}")
             raise e
 
+    def upload_archive(self, path: str, key: str) -> str:
+        """Uploads an archive file to the archive bucket and returns its s3:// URI."""
+        try:
+            self.s3_client.upload_file(path, settings.SCAN_ARCHIVE_S3_BUCKET, key)
+            return f"s3://{settings.SCAN_ARCHIVE_S3_BUCKET}/{key}"
+        except ClientError as e:
+            logger.error(f"S3 archive upload failed: {e}")
+            raise e
+
 s3_service = S3Service()
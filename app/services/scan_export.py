@@ -0,0 +1,170 @@
+"""
+Streaming export of scan history for analytics.
+
+Rows are read through a server-side cursor (`stream` + `yield_per`) as plain
+column tuples, flattened (QA fields, bbox count) and encoded one partition at
+a time, so memory stays flat however many scans are exported.
+
+- csv:     header row plus one line per scan.
+- ndjson:  one JSON object per line.
+- parquet: one row group per partition (needs the optional `pyarrow` package).
+"""
+import csv
+import importlib.util
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence
+
+import orjson
+from sqlalchemy import select
+
+from app.config.settings import settings
+from app.models.pet_scan import PetScan
+from app.utils.db_init import AsyncSessionLocal
+
+FORMATS = ("csv", "ndjson", "parquet")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+COLUMNS = (
+    "id",
+    "created_at",
+    "pet_id",
+    "is_valid_pet",
+    "is_healthy",
+    "detected_pet",
+    "suspected_condition",
+    "severity",
+    "confidence",
+    "bbox_count",
+    "has_diagnosis",
+)
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def flatten(row: Sequence[Any]) -> Dict[str, Any]:
+    """(id, created_at, pet_id, is_valid_pet, is_healthy, result) -> flat export record."""
+    scan_id, created_at, pet_id, is_valid_pet, is_healthy, result = row
+    result = result if isinstance(result, dict) else {}
+    qa = result.get("qa") if isinstance(result.get("qa"), dict) else {}
+    bboxes = result.get("bboxes")
+    return {
+        "id": scan_id,
+        "created_at": created_at,
+        "pet_id": pet_id,
+        "is_valid_pet": is_valid_pet,
+        "is_healthy": is_healthy,
+        "detected_pet": qa.get("detected_pet"),
+        "suspected_condition": qa.get("suspected_condition"),
+        "severity": qa.get("severity"),
+        "confidence": qa.get("confidence"),
+        "bbox_count": len(bboxes) if isinstance(bboxes, list) else 0,
+        "has_diagnosis": bool(result.get("diagnosis")),
+    }
+
+
+def _encode_csv(records: Iterable[Dict[str, Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for record in records:
+        row = [record[column] for column in COLUMNS]
+        row[1] = row[1].isoformat() if row[1] else ""
+        writer.writerow(row)
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(records: Iterable[Dict[str, Any]]) -> bytes:
+    return b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written so far; keeps the true offset for the Parquet footer."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _ParquetEncoder:
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("created_at", pa.timestamp("us")),
+            ("pet_id", pa.string()),
+            ("is_valid_pet", pa.bool_()),
+            ("is_healthy", pa.bool_()),
+            ("detected_pet", pa.string()),
+            ("suspected_condition", pa.string()),
+            ("severity", pa.string()),
+            ("confidence", pa.float64()),
+            ("bbox_count", pa.int32()),
+            ("has_diagnosis", pa.bool_()),
+        ])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema)
+
+    def encode(self, records: List[Dict[str, Any]]) -> bytes:
+        self._writer.write_table(self._pa.Table.from_pylist(records, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+async def export_scans(
+    fmt: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[bytes]:
+    """Stream scans created in [start, end) oldest first; uses its own session so it can outlive the request scope."""
+    query = select(
+        PetScan.id, PetScan.created_at, PetScan.pet_id, PetScan.is_valid_pet, PetScan.is_healthy, PetScan.result
+    ).order_by(PetScan.created_at, PetScan.id)
+    if start is not None:
+        query = query.where(PetScan.created_at >= start)
+    if end is not None:
+        query = query.where(PetScan.created_at < end)
+
+    parquet = _ParquetEncoder() if fmt == "parquet" else None
+    if fmt == "csv":
+        yield (",".join(COLUMNS) + "\n").encode()
+
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=settings.SCAN_EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            records = [flatten(row) for row in partition]
+            if parquet is not None:
+                yield parquet.encode(records)
+            elif fmt == "csv":
+                yield _encode_csv(records)
+            else:
+                yield _encode_ndjson(records)
+
+    if parquet is not None:
+        yield parquet.close()
@@ -0,0 +1,149 @@
+"""
+Group-commit writer for PetScan inserts.
+
+With SCAN_GROUP_COMMIT_ENABLED, scans from concurrent requests are queued and
+written by one background task: it waits up to SCAN_GROUP_COMMIT_WINDOW seconds
+after the first queued scan (or until SCAN_GROUP_COMMIT_MAX_BATCH are queued)
+and inserts the whole batch with one multi-row INSERT in one transaction, i.e.
+one commit/fsync for the batch instead of one per scan.
+
+`write()` returns once the batch holding the scan is committed, so callers keep
+their durability guarantee. If a batch fails, its rows are retried one by one so
+only the offending scan reports the error. `close()` drains the queue on shutdown.
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app.config.settings import settings
+from app.models.pet_scan import PetScan
+from app.services import metrics
+from app.utils.db_init import engine
+
+logger = logging.getLogger(__name__)
+
+Pending = Tuple[Dict[str, Any], asyncio.Future]
+
+
+class ScanWriter:
+    def __init__(self, max_batch: int, window: float):
+        self.max_batch = max_batch
+        self.window = window
+        self._queue: List[Pending] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @staticmethod
+    def _row(scan: PetScan) -> Dict[str, Any]:
+        # Fill the Python-side defaults here, so every row of a batch has the same columns
+        return {
+            "id": scan.id,
+            "is_valid_pet": bool(scan.is_valid_pet),
+            "is_healthy": True if scan.is_healthy is None else scan.is_healthy,
+            "result": scan.result,
+            "result_hash": scan.result_hash,
+            "created_at": scan.created_at or datetime.utcnow(),
+            "pet_id": scan.pet_id,
+        }
+
+    async def write(self, scan: PetScan) -> None:
+        """Insert `scan`; returns when it is committed."""
+        row = self._row(scan)
+        if self._closing:
+            await self._insert([row])
+            return
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            # Fresh context: the writer must not report its queries as spans of the first request
+            self._task = asyncio.create_task(self._run(), context=contextvars.Context())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((row, future))
+        if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+            self._wakeup.set()
+        # A cancelled caller must not take the rest of the batch with it
+        await asyncio.shield(future)
+
+    async def _run(self) -> None:
+        try:
+            await self._loop()
+        finally:
+            # Only reached early if the writer itself crashed or was cancelled
+            queued, self._queue = self._queue, []
+            self._resolve(queued, RuntimeError("Scan writer stopped"))
+
+    async def _loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if not self._queue:
+                if self._closing:
+                    return
+                continue
+            # Give concurrent requests a short window to join the batch
+            flush_at = time.monotonic() + self.window
+            while len(self._queue) < self.max_batch and not self._closing:
+                left = flush_at - time.monotonic()
+                if left <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=left)
+                except asyncio.TimeoutError:
+                    break
+                self._wakeup.clear()
+            while self._queue:
+                batch, self._queue = self._queue[: self.max_batch], self._queue[self.max_batch:]
+                await self._flush(batch)
+            if self._closing:
+                return
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        async with engine.begin() as conn:
+            await conn.execute(insert(PetScan).values(rows))
+        metrics.SCAN_GROUP_COMMIT_SIZE.observe(len(rows))
+
+    async def _flush(self, batch: List[Pending]) -> None:
+        try:
+            await self._insert([row for row, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._resolve(batch, e)
+                return
+            logger.warning(f"Group commit of {len(batch)} scans failed ({e}); retrying them one by one")
+            for pending in batch:
+                try:
+                    await self._insert([pending[0]])
+                except Exception as row_error:
+                    self._resolve([pending], row_error)
+                else:
+                    self._resolve([pending])
+            return
+        self._resolve(batch)
+
+    @staticmethod
+    def _resolve(batch: List[Pending], error: Optional[BaseException] = None) -> None:
+        for _, future in batch:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def close(self) -> None:
+        """Flush everything queued and stop the writer task."""
+        self._closing = True
+        if self._task is None:
+            return
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+
+scan_writer = ScanWriter(settings.SCAN_GROUP_COMMIT_MAX_BATCH, settings.SCAN_GROUP_COMMIT_WINDOW)
@@ -0,0 +1,56 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Spans of the current request as (name, seconds); None when timing is not active
+_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_spans", default=None)
+
+
+def start_request() -> List[Tuple[str, float]]:
+    """Begin collecting spans for the current request and return the collector."""
+    spans: List[Tuple[str, float]] = []
+    _spans.set(spans)
+    return spans
+
+
+def add_span(name: str, seconds: float) -> None:
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name: str):
+    """Record the duration of the enclosed block as a named span of the request."""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, time.perf_counter() - start))
+
+
+def server_timing_header(spans: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """
+    Format spans as a Server-Timing header value.
+    Repeated spans (e.g. several DB queries) are summed and their count is put in `desc`.
+    """
+    totals: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for name, seconds in spans:
+        totals[name] = totals.get(name, 0.0) + seconds
+        counts[name] = counts.get(name, 0) + 1
+
+    parts = []
+    for name, seconds in totals.items():
+        entry = f"{name};dur={seconds * 1000:.1f}"
+        if counts[name] > 1:
+            entry += f';desc="x{counts[name]}"'
+        parts.append(entry)
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,249 @@
+"""
+Emergency triage rule engine.
+
+Rules live in the triage_rules table. Every keyword and synonym of the enabled
+rules is compiled into one matcher, so matching stays a single pass over the
+disease name and symptoms however many rules there are:
+
+- pyahocorasick's automaton when the package is installed,
+- otherwise one regex shaped as a trie of the keywords (`parvo(?:virus)?`),
+  which only ever follows one branch per character. It is a zero-width
+  lookahead, so every word start is tried and keywords inside a longer match
+  ("bloat" in "gastric bloat") are found too.
+
+Both report every whole-word keyword in the text, overlapping ones included.
+
+The engine reloads the rules when the table changes. Every TRIAGE_RELOAD_INTERVAL
+seconds it reads the (small) table and hashes the rule contents, which also
+catches edits made by other workers or directly in SQL; the matcher is only
+recompiled when the hash changes.
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import func, select
+
+from app.config.settings import settings
+from app.models.triage_rule import TriageRule
+from app.services.http_cache import content_hash
+from app.schemas.triage import TriageResult
+from app.utils.db_init import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+URGENCY_RANK = {"routine": 0, "urgent": 1, "emergency": 2}
+
+ROUTINE = TriageResult(
+    is_emergency=False,
+    urgency="routine",
+    reason="Symptoms appear manageable at home, but monitor closely.",
+    next_steps=["Schedule a regular vet appointment", "Monitor for worsening symptoms"],
+)
+
+DEFAULT_RULES = [
+    {
+        "name": "rabies",
+        "keywords": ["rabies", "hydrophobia", "lyssavirus"],
+        "urgency": "emergency",
+        "priority": 100,
+        "reason": "Condition '{disease_name}' is highly life-threatening and requires immediate isolation and treatment.",
+        "next_steps": ["GO TO EMERGENCY VET NOW", "Isolate pet immediately"],
+    },
+    {
+        "name": "parvovirus",
+        "keywords": ["parvovirus", "parvo", "canine parvovirus", "feline panleukopenia", "panleukopenia"],
+        "urgency": "emergency",
+        "priority": 100,
+        "reason": "Condition '{disease_name}' is highly life-threatening and requires immediate isolation and treatment.",
+        "next_steps": ["GO TO EMERGENCY VET NOW", "Isolate pet immediately"],
+    },
+    {
+        "name": "critical severity",
+        "severities": ["severe", "critical"],
+        "urgency": "emergency",
+        "priority": 50,
+        "reason": "Severity level is critical. Vital functions may be at risk.",
+        "next_steps": ["Contact emergency clinic immediately", "Prepare pet for transport"],
+    },
+]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+_WORD = re.compile(r"\w")
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation of `words` factored into a trie."""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = f"(?:{body})?"
+        return body
+
+    return emit(trie)
+
+
+class _RegexMatcher:
+    def __init__(self, keywords: Sequence[str]):
+        self._pattern = re.compile(rf"(?<!\w)(?=({trie_pattern(keywords)})(?!\w))") if keywords else None
+        # The lookahead captures the longest keyword at each start; shorter ones
+        # starting there are whole-word prefixes of it ("seizure" of "seizure cluster")
+        known = set(keywords)
+        self._prefixes = {
+            keyword: [keyword[:i] for i in range(1, len(keyword)) if not _WORD.match(keyword[i]) and keyword[:i] in known]
+            for keyword in keywords
+        }
+
+    def find(self, text: str) -> Set[str]:
+        if self._pattern is None:
+            return set()
+        found = set()
+        for match in self._pattern.finditer(text):
+            found.add(match.group(1))
+            found.update(self._prefixes[match.group(1)])
+        return found
+
+
+class _AhoCorasickMatcher:
+    def __init__(self, keywords: Sequence[str]):
+        import ahocorasick
+
+        self._automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            self._automaton.add_word(keyword, keyword)
+        self._empty = not keywords
+        if keywords:
+            self._automaton.make_automaton()
+
+    def find(self, text: str) -> Set[str]:
+        if self._empty:
+            return set()
+        found = set()
+        for end, keyword in self._automaton.iter(text):
+            start = end - len(keyword) + 1
+            # Whole words only
+            if (start == 0 or not _WORD.match(text[start - 1])) and (end + 1 == len(text) or not _WORD.match(text[end + 1])):
+                found.add(keyword)
+        return found
+
+
+def _make_matcher(keywords: Sequence[str]):
+    try:
+        return _AhoCorasickMatcher(keywords)
+    except ImportError:
+        return _RegexMatcher(keywords)
+
+
+class RuleSet:
+    """Enabled rules compiled for matching."""
+
+    def __init__(self, rules: Sequence[TriageRule]):
+        self.rules = list(rules)
+        self.by_keyword: Dict[str, List[int]] = {}
+        self.without_keywords: List[int] = []
+        self._severities = [{normalize(s) for s in rule.severities or []} for rule in self.rules]
+        self._pet_types = [{normalize(p) for p in rule.pet_types or []} for rule in self.rules]
+        for index, rule in enumerate(self.rules):
+            keywords = {normalize(keyword) for keyword in rule.keywords or [] if keyword.strip()}
+            if not keywords:
+                self.without_keywords.append(index)
+            for keyword in keywords:
+                self.by_keyword.setdefault(keyword, []).append(index)
+        self.matcher = _make_matcher(sorted(self.by_keyword))
+
+    def evaluate(
+        self,
+        disease_name: str = "",
+        symptoms: Sequence[str] = (),
+        severity: Optional[str] = None,
+        pet_type: Optional[str] = None,
+    ) -> TriageResult:
+        text = normalize(" | ".join([disease_name or "", *symptoms]))
+        severity = normalize(severity or "")
+        pet_type = normalize(pet_type or "")
+
+        candidates = set(self.without_keywords)
+        for keyword in self.matcher.find(text):
+            candidates.update(self.by_keyword[keyword])
+
+        matched = [
+            self.rules[index] for index in candidates
+            if (not self._severities[index] or severity in self._severities[index])
+            and (not self._pet_types[index] or pet_type in self._pet_types[index])
+        ]
+        if not matched:
+            return ROUTINE
+        matched.sort(key=lambda rule: (URGENCY_RANK.get(rule.urgency, 0), rule.priority), reverse=True)
+        best = matched[0]
+        return TriageResult(
+            is_emergency=best.urgency == "emergency",
+            urgency=best.urgency,
+            reason=best.reason.replace("{disease_name}", disease_name or "unknown"),
+            next_steps=list(best.next_steps or []),
+            matched_rules=[rule.name for rule in matched],
+        )
+
+
+class TriageEngine:
+    def __init__(self):
+        self._rules = RuleSet([])
+        self._fingerprint = None
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def reload(self, force: bool = False) -> None:
+        async with self._lock:
+            if not force and time.monotonic() - self._checked_at < settings.TRIAGE_RELOAD_INTERVAL:
+                return
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(select(TriageRule).order_by(TriageRule.id))
+                all_rules = result.scalars().all()
+            fingerprint = content_hash([
+                [getattr(rule, column.key) for column in TriageRule.__table__.columns] for rule in all_rules
+            ])
+            if not force and fingerprint == self._fingerprint:
+                self._checked_at = time.monotonic()
+                return
+            rules = [rule for rule in all_rules if rule.enabled]
+            self._rules = await asyncio.to_thread(RuleSet, rules)
+            self._fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+            logger.info(f"Loaded {len(rules)} triage rules ({len(self._rules.by_keyword)} keywords)")
+
+    def invalidate(self) -> None:
+        """Re-check the table on the next evaluation (after a write through the API)."""
+        self._checked_at = float("-inf")
+
+    async def evaluate(self, **kwargs) -> TriageResult:
+        if time.monotonic() - self._checked_at >= settings.TRIAGE_RELOAD_INTERVAL:
+            await self.reload()
+        return self._rules.evaluate(**kwargs)
+
+    async def seed_defaults(self) -> None:
+        """Insert the built-in rules into an empty table."""
+        async with AsyncSessionLocal() as session:
+            if await session.scalar(select(func.count()).select_from(TriageRule)):
+                return
+            session.add_all(TriageRule(**rule) for rule in DEFAULT_RULES)
+            await session.commit()
+        logger.info(f"Seeded {len(DEFAULT_RULES)} default triage rules")
+        self.invalidate()
+
+
+triage_engine = TriageEngine()
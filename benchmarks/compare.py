@@ -0,0 +1,59 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json --max-regression 0.1
+
+Exits with status 1 when the p95 latency or throughput of any scenario
+regresses by more than `--max-regression` (fraction).
+"""
+import argparse
+import json
+import sys
+
+
+def _delta(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        old = json.load(f)
+    with open(args.candidate) as f:
+        new = json.load(f)
+
+    print(f"{old.get('revision')} -> {new.get('revision')}")
+    failed = False
+    for name, new_res in new["scenarios"].items():
+        old_res = old["scenarios"].get(name)
+        if not old_res:
+            print(f"{name}: no baseline")
+            continue
+        rows = [
+            ("throughput_rps", old_res["throughput_rps"], new_res["throughput_rps"], -1),
+            ("p50_ms", old_res["latency_ms"]["p50"], new_res["latency_ms"]["p50"], 1),
+            ("p95_ms", old_res["latency_ms"]["p95"], new_res["latency_ms"]["p95"], 1),
+            ("p99_ms", old_res["latency_ms"]["p99"], new_res["latency_ms"]["p99"], 1),
+            ("peak_rss_kb", old_res["server_memory"]["peak_rss_kb"], new_res["server_memory"]["peak_rss_kb"], 1),
+        ]
+        print(f"\n[{name}]")
+        for metric, old_value, new_value, direction in rows:
+            delta = _delta(old_value, new_value)
+            shown = f"{delta:+.1%}" if delta is not None else "n/a"
+            print(f"  {metric:<15} {old_value!s:>12} -> {new_value!s:>12}  ({shown})")
+            if metric in ("throughput_rps", "p95_ms") and delta is not None and delta * direction > args.max_regression:
+                failed = True
+                print(f"  !! {metric} regressed beyond {args.max_regression:.0%}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Local stand-in for the Gemini SDK client used by the benchmark suite.
+
+It replaces `gemini_service._client`, so the real GeminiService code path
+(retries, fallback, JSON parsing, metrics) still runs, but no quota is spent.
+"""
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict
+
+
+@dataclass
+class FakeGeminiConfig:
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    error_rate: float = 0.0
+    # Every `burst_every_s` seconds, all calls fail with 429 for `burst_duration_s`
+    burst_every_s: float = 0.0
+    burst_duration_s: float = 0.0
+    invalid_pet_rate: float = 0.1
+    unhealthy_rate: float = 0.4
+    seed: int = 42
+
+
+class FakeQuotaError(Exception):
+    """Mimics the SDK error raised on quota exhaustion."""
+
+    def __init__(self):
+        super().__init__("429 RESOURCE_EXHAUSTED. Quota exceeded (fake backend).")
+
+
+class FakeServerError(Exception):
+    def __init__(self):
+        super().__init__("500 INTERNAL. Fake backend error.")
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+# Response schema class -> prompt type, for prompts that use structured output
+SCHEMA_PROMPT_TYPES = {
+    "QAResult": "qa",
+    "BoundingBoxes": "bbox",
+    "DiagnosticAnalysis": "diagnostic",
+    "FullDiagnosis": "text_diagnosis",
+    "CombinedAnalysis": "combined",
+}
+
+
+def detect_prompt_type(contents: Any, config: Any = None) -> str:
+    schema = getattr(config, "response_schema", None)
+    # Field retries use a "<Schema>Patch" model; answer them with the full canned response
+    name = getattr(schema, "__name__", "").removesuffix("Patch")
+    if name in SCHEMA_PROMPT_TYPES:
+        return SCHEMA_PROMPT_TYPES[name]
+    text = str(contents)
+    if "box_2d" in text:
+        return "bbox"
+    if "disease_overview" in text:
+        return "text_diagnosis"
+    if "detected_pet_type" in text:
+        return "diagnostic"
+    return "qa"
+
+
+class _FakeModels:
+    def __init__(self, config: FakeGeminiConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self.calls: Dict[str, int] = {}
+
+    def _in_burst(self) -> bool:
+        cfg = self.config
+        if cfg.burst_every_s <= 0 or cfg.burst_duration_s <= 0:
+            return False
+        elapsed = time.monotonic() - self._started
+        return elapsed % cfg.burst_every_s < cfg.burst_duration_s
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> _FakeResponse:
+        prompt_type = detect_prompt_type(contents, config)
+        with self._lock:
+            self.calls[prompt_type] = self.calls.get(prompt_type, 0) + 1
+            latency = max(0.0, self._rng.gauss(self.config.latency_ms, self.config.jitter_ms)) / 1000
+            fail = self._rng.random() < self.config.error_rate
+            roll_valid = self._rng.random()
+            roll_healthy = self._rng.random()
+
+        # Blocking sleep, like the real SDK call running in the executor
+        time.sleep(latency)
+        if self._in_burst():
+            raise FakeQuotaError()
+        if fail:
+            raise FakeServerError()
+        return _FakeResponse(json.dumps(canned_response(prompt_type, roll_valid, roll_healthy, self.config)))
+
+
+class FakeGeminiClient:
+    def __init__(self, config: FakeGeminiConfig):
+        self.models = _FakeModels(config)
+
+
+def canned_response(prompt_type: str, roll_valid: float, roll_healthy: float, cfg: FakeGeminiConfig) -> Dict[str, Any]:
+    is_valid = roll_valid >= cfg.invalid_pet_rate
+    is_healthy = roll_healthy >= cfg.unhealthy_rate
+    condition = "" if is_healthy else "Parvovirus"
+
+    detections = [] if is_healthy else [
+        {"label": "Affected area", "box_2d": [120, 200, 380, 460]},
+        {"label": "Affected area", "box_2d": [125, 205, 385, 455]},
+    ]
+    diagnosis = {
+        "disease_overview": "Canine parvovirus is a highly contagious viral disease.",
+        "common_symptoms": ["Vomiting", "Bloody diarrhea", "Lethargy"],
+        "general_treatment": ["IV fluids", "Antiemetics"],
+        "home_care_tips": ["Keep the pet hydrated", "Isolate from other dogs"],
+        "when_to_visit_vet": ["Immediately if symptoms appear"],
+        "disclaimer": "This is AI-generated and not a substitute for professional veterinary advice.",
+    }
+    if prompt_type == "bbox":
+        return {"detections": detections}
+    if prompt_type == "text_diagnosis":
+        return diagnosis
+    if prompt_type == "combined":
+        return {
+            "is_valid_pet": is_valid,
+            "detected_pet": "Dog" if is_valid else "None",
+            "is_healthy": is_healthy,
+            "suspected_condition": condition,
+            "severity": "" if is_healthy else "severe",
+            "confidence": 0.9,
+            "detections": detections,
+            "diagnosis": None if is_healthy else diagnosis,
+        }
+    if prompt_type == "diagnostic":
+        return {
+            "is_valid_pet": is_valid,
+            "detected_pet_type": "Dog",
+            "pet_info": {"common_name": "Dog", "scientific_name": "Canis lupus familiaris"},
+            "disease_info": {
+                "common_name": condition,
+                "scientific_name": "",
+                "pathogen_type": "Virus" if condition else "",
+                "cause": "",
+                "symptoms": "",
+                "transmission_mode": "",
+                "severity": "" if is_healthy else "severe",
+            },
+            "management": {"home_care": [], "veterinary_treatment": []},
+        }
+    return {
+        "is_valid_pet": is_valid,
+        "detected_pet": "Dog" if is_valid else "None",
+        "is_healthy": is_healthy,
+        "suspected_condition": condition,
+        "severity": "" if is_healthy else "severe",
+        "confidence": 0.9,
+    }
+
+
+def install(config: FakeGeminiConfig) -> FakeGeminiClient:
+    """Swap the SDK client of the app's GeminiService for the fake one."""
+    from app.services.gemini import gemini_service
+
+    client = FakeGeminiClient(config)
+    gemini_service._client = client
+    return client
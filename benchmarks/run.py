@@ -0,0 +1,262 @@
+"""
+Load-test the API offline and save the results as JSON.
+
+Starts `benchmarks.server` (fake Gemini backend + local database) in a
+subprocess, drives the main routes at the target concurrency and reports
+throughput, p50/p95/p99 latency and server memory.
+
+    python -m benchmarks.run --concurrency 16 --requests 400
+    python -m benchmarks.run --scenarios scan,stats --latency-ms 800 --burst-every 20 --burst-duration 3
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+API = "/api/v1"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+KB_SEED = [
+    ("Dog", "Parvovirus", "Isolation, IV fluids and antiemetics."),
+    ("Dog", "Rabies", "Immediate quarantine and reporting."),
+    ("Cat", "Feline Calicivirus", "Hydration therapy and pain management."),
+    ("Cat", "Feline Leukemia", "Supportive care and high-protein diet."),
+]
+
+
+def make_image(size: int = 512) -> bytes:
+    from PIL import Image
+
+    img = Image.new("RGB", (size, size))
+    rng = random.Random(0)
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(size * size)])
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def read_proc_memory(pid: int) -> Dict[str, Optional[int]]:
+    """Resident and peak resident memory (KiB) of a process, Linux only."""
+    mem: Dict[str, Optional[int]] = {"rss_kb": None, "peak_rss_kb": None}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    mem["rss_kb"] = int(line.split()[1])
+                elif line.startswith("VmHWM:"):
+                    mem["peak_rss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return mem
+
+
+class Scenario:
+    def __init__(self, name: str, make_request: Callable[[httpx.AsyncClient], Any]):
+        self.name = name
+        self.make_request = make_request
+
+
+def build_scenarios(image: bytes, scan_ids: List[str]) -> Dict[str, Scenario]:
+    def scan(client):
+        files = {"image": ("bench.jpg", image, "image/jpeg")}
+        return client.post(f"{API}/pets/scan", files=files, data={"pet_name": "Dog"})
+
+    def diagnosis(client):
+        return client.get(f"{API}/scans/{random.choice(scan_ids)}/diagnosis")
+
+    stats_paths = [f"{API}/stats/scans", f"{API}/stats/diseases"]
+
+    def stats(client):
+        return client.get(random.choice(stats_paths))
+
+    kb_paths = [
+        f"{API}/kb/",
+        f"{API}/kb/diseases",
+        f"{API}/kb/treatment?pet_name=Dog&disease_name=Parvovirus",
+    ]
+
+    def kb(client):
+        return client.get(random.choice(kb_paths))
+
+    return {
+        "scan": Scenario("scan", scan),
+        "diagnosis": Scenario("diagnosis", diagnosis),
+        "stats": Scenario("stats", stats),
+        "kb": Scenario("kb", kb),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                resp = await scenario.make_request(client)
+                key = str(resp.status_code)
+            except httpx.HTTPError as e:
+                key = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith("2"))
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total / wall, 2) if wall else None,
+        "success_rate": round(ok / total, 4) if total else None,
+        "statuses": statuses,
+        "latency_ms": {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (
+                ("p50", percentile(latencies, 50)),
+                ("p95", percentile(latencies, 95)),
+                ("p99", percentile(latencies, 99)),
+                ("max", latencies[-1] if latencies else None),
+                ("mean", sum(latencies) / len(latencies) if latencies else None),
+            )
+        },
+    }
+
+
+async def seed(client: httpx.AsyncClient, image: bytes, count: int) -> List[str]:
+    for pet, disease, treatment in KB_SEED:
+        await client.post(f"{API}/kb/", json={"pet_name": pet, "disease_name": disease, "treatment": treatment})
+    scan_ids = []
+    for _ in range(count * 3):
+        resp = await client.post(
+            f"{API}/pets/scan",
+            files={"image": ("seed.jpg", image, "image/jpeg")},
+            data={"pet_name": "Dog"},
+        )
+        if resp.status_code == 200 and resp.json().get("scan_id"):
+            scan_ids.append(resp.json()["scan_id"])
+        if len(scan_ids) >= count:
+            break
+    return scan_ids
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{API}/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Benchmark server did not become ready")
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> Dict[str, Any]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server_cmd = [
+        sys.executable, "-m", "benchmarks.server",
+        "--port", str(args.port),
+        "--database-url", args.database_url,
+        "--latency-ms", str(args.latency_ms),
+        "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate),
+        "--burst-every", str(args.burst_every),
+        "--burst-duration", str(args.burst_duration),
+    ]
+    server = subprocess.Popen(server_cmd)
+    try:
+        await wait_ready(base_url)
+        image = make_image(args.image_size)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+            scan_ids = await seed(client, image, count=20)
+            if not scan_ids:
+                raise RuntimeError("Seeding produced no scans; check the server log")
+            scenarios = build_scenarios(image, scan_ids)
+
+            memory_before = read_proc_memory(server.pid)
+            results = {}
+            for name in args.scenarios.split(","):
+                print(f"Running {name}: {args.requests} requests at concurrency {args.concurrency}...")
+                results[name] = await run_scenario(client, scenarios[name], args.requests, args.concurrency)
+                results[name]["server_memory"] = read_proc_memory(server.pid)
+                print(f"  {results[name]['throughput_rps']} req/s, latency {results[name]['latency_ms']}")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            key: getattr(args, key)
+            for key in ("concurrency", "requests", "latency_ms", "jitter_ms", "error_rate",
+                        "burst_every", "burst_duration", "image_size", "database_url")
+        },
+        "server_memory_start": memory_before,
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test with a fake Gemini backend.")
+    parser.add_argument("--scenarios", default="scan,diagnosis,stats,kb")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="Requests per scenario")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///./bench.db")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0)
+    parser.add_argument("--burst-duration", type=float, default=0.0)
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<time>_<rev>.json)")
+    args = parser.parse_args()
+
+    if args.database_url.startswith("sqlite") and os.path.exists("bench.db"):
+        os.remove("bench.db")
+
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{report['revision'] or 'norev'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
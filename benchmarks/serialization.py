@@ -0,0 +1,120 @@
+"""
+Micro-benchmark of response serialization for a page of scans.
+
+Times three ways of turning a `GET /scans/` page (ORM rows with full results)
+into JSON bytes:
+
+- untyped:  jsonable_encoder + json.dumps (the route without a response model),
+- orjson:   jsonable_encoder + ORJSONResponse (untyped routes since the default response class),
+- typed:    List[ScanRecord] validated from attributes and dumped by pydantic-core
+            (what FastAPI does for routes with a response model).
+
+    python -m benchmarks.serialization --items 200 --rounds 200
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.models.pet_scan import PetScan
+from app.schemas.scans import ScanRecord
+from app.utils.responses import ORJSONResponse
+
+DISEASES = ["Parvovirus", "Sarcoptic Mange", "Ringworm", "Ear Mites", "Canine Distemper"]
+
+
+def _scans(count: int, seed: int = 42) -> List[PetScan]:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    scans = []
+    for i in range(count):
+        disease = rng.choice(DISEASES)
+        result = {
+            "qa": {
+                "is_valid_pet": True,
+                "detected_pet": rng.choice(["Dog", "Cat"]),
+                "is_healthy": False,
+                "suspected_condition": disease,
+                "severity": rng.choice(["mild", "moderate", "severe"]),
+                "confidence": round(rng.random(), 2),
+            },
+            "bboxes": [
+                {"label": "Affected area", "box_2d": [rng.randint(0, 500) for _ in range(4)], "box_px": [rng.randint(0, 900) for _ in range(4)]}
+                for _ in range(rng.randint(1, 4))
+            ],
+            "diagnosis": {
+                "disease_overview": f"{disease} is a common condition. " * 4,
+                "common_symptoms": ["Lethargy", "Loss of appetite", "Hair loss", "Itching"],
+                "general_treatment": ["Veterinary examination", "Medication as prescribed"],
+                "home_care_tips": ["Keep the pet hydrated", "Isolate from other pets", "Clean bedding daily"],
+                "when_to_visit_vet": ["Symptoms worsen", "No improvement within 48 hours"],
+                "disclaimer": "AI assessment based on visual scan.",
+            },
+            "image_size": [1024, 768],
+            "triage": {
+                "is_emergency": False,
+                "urgency": "routine",
+                "reason": "Symptoms appear manageable at home, but monitor closely.",
+                "next_steps": ["Schedule a regular vet appointment", "Monitor for worsening symptoms"],
+                "matched_rules": [],
+            },
+        }
+        scans.append(PetScan(
+            id=f"petscan_{i:08x}",
+            is_valid_pet=True,
+            is_healthy=False,
+            result=result,
+            result_hash="0" * 32,
+            created_at=now - timedelta(minutes=i),
+            pet_id=None,
+        ))
+    return scans
+
+
+def _time(fn: Callable[[], bytes], rounds: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serialization of a scan page.")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    scans = _scans(args.items)
+    adapter = TypeAdapter(List[ScanRecord])
+    json_response = JSONResponse(None)
+    orjson_response = ORJSONResponse(None)
+
+    variants = {
+        "untyped": lambda: json_response.render(jsonable_encoder(scans)),
+        "orjson": lambda: orjson_response.render(jsonable_encoder(scans)),
+        "typed": lambda: adapter.dump_json(adapter.validate_python(scans, from_attributes=True)),
+    }
+    # Same payload from every variant, up to key order and float formatting
+    decoded = {name: json.loads(fn()) for name, fn in variants.items()}
+    assert all(len(body) == args.items for body in decoded.values())
+
+    baseline = None
+    print(f"{args.items} scans per page, {args.rounds} rounds")
+    for name, fn in variants.items():
+        seconds = _time(fn, args.rounds)
+        baseline = baseline or seconds
+        print(
+            f"{name:>8}: {seconds * 1000:7.2f} ms/page  {1 / seconds:8.1f} pages/s  "
+            f"{len(fn()) / 1024:6.1f} KiB  x{baseline / seconds:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
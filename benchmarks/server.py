@@ -0,0 +1,49 @@
+"""
+Start the app against the fake Gemini backend and a local database.
+
+    python -m benchmarks.server --port 8765 --latency-ms 300 --error-rate 0.02
+"""
+import argparse
+import os
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with a fake Gemini backend.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///./bench.db")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0, help="Seconds between 429 bursts")
+    parser.add_argument("--burst-duration", type=float, default=0.0, help="Length of each 429 burst")
+    parser.add_argument("--invalid-pet-rate", type=float, default=0.1)
+    parser.add_argument("--unhealthy-rate", type=float, default=0.4)
+    args = parser.parse_args()
+
+    # Settings are read at import time, so configure the environment first
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("GEMINI_API_KEY", "fake-benchmark-key")
+    os.environ.setdefault("DATABASE_ECHO", "false")
+
+    import logging
+    import uvicorn
+
+    from app.main import app
+    from benchmarks.fake_gemini import FakeGeminiConfig, install
+
+    install(FakeGeminiConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        burst_every_s=args.burst_every,
+        burst_duration_s=args.burst_duration,
+        invalid_pet_rate=args.invalid_pet_rate,
+        unhealthy_rate=args.unhealthy_rate,
+    ))
+    logging.getLogger().setLevel(logging.WARNING)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Partition pet_scans by month on created_at
+
+Revision ID: 0001_partition_pet_scans
+Revises:
+Create Date: 2026-10-19
+
+PostgreSQL only; other databases keep the plain table created by the app.
+Existing rows are copied into the partitioned table (in offline --sql mode,
+rows older than the current month land in the default partition). The primary key becomes
+(id, created_at) because a partitioned table's keys must include the partition
+column.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.config.settings import settings
+from app.services.partitions import add_months, month_start, partition_ddl
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_partition_pet_scans"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def _relkind(bind) -> Union[str, None]:
+    if context.is_offline_mode():
+        # No database to inspect when generating SQL; assume the app-created plain table
+        return "r"
+    return bind.execute(sa.text(
+        "SELECT relkind FROM pg_class WHERE relname = 'pet_scans' AND pg_table_is_visible(oid)"
+    )).scalar()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    relkind = _relkind(bind)
+    if relkind == "p":
+        return
+
+    first = datetime.utcnow()
+    if relkind is not None:
+        op.execute("ALTER TABLE pet_scans RENAME TO pet_scans_unpartitioned")
+        op.execute("ALTER TABLE pet_scans_unpartitioned RENAME CONSTRAINT pet_scans_pkey TO pet_scans_unpartitioned_pkey")
+        if not context.is_offline_mode():
+            first = bind.execute(sa.text("SELECT min(created_at) FROM pet_scans_unpartitioned")).scalar() or first
+
+    if relkind is None:
+        op.execute("""
+            CREATE TABLE pet_scans (
+                id VARCHAR NOT NULL,
+                is_valid_pet BOOLEAN,
+                is_healthy BOOLEAN,
+                result JSON,
+                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+    else:
+        # Same columns as the existing table, whichever app version created it
+        op.execute("CREATE TABLE pet_scans (LIKE pet_scans_unpartitioned) PARTITION BY RANGE (created_at)")
+        op.execute("ALTER TABLE pet_scans ADD PRIMARY KEY (id, created_at)")
+    op.execute("ALTER TABLE pet_scans ALTER COLUMN created_at SET DEFAULT (now() AT TIME ZONE 'utc')")
+    op.execute("CREATE INDEX ix_pet_scans_created_at ON pet_scans (created_at)")
+    op.execute("CREATE TABLE pet_scans_default PARTITION OF pet_scans DEFAULT")
+
+    month = month_start(first)
+    last = add_months(month_start(datetime.utcnow()), settings.SCAN_PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        op.execute(partition_ddl(month))
+        month = add_months(month, 1)
+
+    if relkind is not None:
+        op.execute("UPDATE pet_scans_unpartitioned SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL")
+        op.execute("INSERT INTO pet_scans SELECT * FROM pet_scans_unpartitioned")
+        op.execute("DROP TABLE pet_scans_unpartitioned")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or _relkind(bind) != "p":
+        return
+    op.execute("ALTER TABLE pet_scans RENAME TO pet_scans_partitioned")
+    op.execute("CREATE TABLE pet_scans (LIKE pet_scans_partitioned INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE pet_scans ADD PRIMARY KEY (id)")
+    op.execute("INSERT INTO pet_scans SELECT * FROM pet_scans_partitioned")
+    op.execute("DROP TABLE pet_scans_partitioned CASCADE")
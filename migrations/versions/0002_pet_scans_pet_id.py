@@ -0,0 +1,73 @@
+"""Link pet_scans to pets
+
+Revision ID: 0002_pet_scans_pet_id
+Revises: 0001_partition_pet_scans
+Create Date: 2026-10-19
+
+Adds the nullable pet_scans.pet_id foreign key and the (pet_id, created_at)
+index behind the per-pet scan history. Tables created by a newer app version
+already have both, so existing objects are skipped. On a fresh database
+without pet_scans (non-PostgreSQL, where 0001 does nothing) there is nothing
+to change; the app creates both tables. A missing pets table is created here
+so the foreign key has a target.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_pet_scans_pet_id"
+down_revision: Union[str, None] = "0001_partition_pet_scans"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "ix_pet_scans_pet_id_created_at"
+FOREIGN_KEY = "fk_pet_scans_pet_id_pets"
+
+
+def _create_pets() -> None:
+    op.create_table(
+        "pets",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("pet_name", sa.String(), nullable=False),
+        sa.Column("pet_type", sa.String(), nullable=False),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("gender", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if context.is_offline_mode():
+        # Assume the app-created tables, which include pets
+        columns, indexes, has_foreign_key = set(), set(), False
+        has_pets = True
+    else:
+        inspector = sa.inspect(bind)
+        if not inspector.has_table("pet_scans"):
+            return
+        has_pets = inspector.has_table("pets")
+        columns = {column["name"] for column in inspector.get_columns("pet_scans")}
+        indexes = {index["name"] for index in inspector.get_indexes("pet_scans")}
+        has_foreign_key = any(
+            fk["constrained_columns"] == ["pet_id"] for fk in inspector.get_foreign_keys("pet_scans")
+        )
+
+    if not has_pets:
+        _create_pets()
+    if "pet_id" not in columns:
+        op.add_column("pet_scans", sa.Column("pet_id", sa.String(), nullable=True))
+    # SQLite cannot add constraints to an existing table
+    if not has_foreign_key and bind.dialect.name != "sqlite":
+        op.create_foreign_key(FOREIGN_KEY, "pet_scans", "pets", ["pet_id"], ["id"], ondelete="SET NULL")
+    if INDEX not in indexes:
+        op.create_index(INDEX, "pet_scans", ["pet_id", "created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX, table_name="pet_scans")
+    if op.get_bind().dialect.name != "sqlite":
+        op.drop_constraint(FOREIGN_KEY, "pet_scans", type_="foreignkey")
+    op.drop_column("pet_scans", "pet_id")
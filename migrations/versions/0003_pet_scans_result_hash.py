@@ -0,0 +1,37 @@
+"""Store a hash of each scan result
+
+Revision ID: 0003_pet_scans_result_hash
+Revises: 0002_pet_scans_pet_id
+Create Date: 2026-10-19
+
+Adds the nullable pet_scans.result_hash column used as the scan ETag, so
+conditional GETs can be answered without loading the result JSON. Older scans
+keep NULL and get their hash computed on read.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_pet_scans_result_hash"
+down_revision: Union[str, None] = "0002_pet_scans_pet_id"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if context.is_offline_mode():
+        columns = set()
+    else:
+        inspector = sa.inspect(op.get_bind())
+        if not inspector.has_table("pet_scans"):
+            # Fresh database: the app creates pet_scans with the column
+            return
+        columns = {column["name"] for column in inspector.get_columns("pet_scans")}
+    if "result_hash" not in columns:
+        op.add_column("pet_scans", sa.Column("result_hash", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("pet_scans", "result_hash")
@@ -0,0 +1,41 @@
+"""Unique (pet_name, disease_name) in pet_kb
+
+Revision ID: 0004_pet_kb_unique_key
+Revises: 0003_pet_scans_result_hash
+Create Date: 2026-10-19
+
+KB imports upsert on (pet_name, disease_name), which needs a unique index.
+Duplicate entries left by older versions are removed first, keeping the most
+recently inserted row (highest id) of each pair.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_pet_kb_unique_key"
+down_revision: Union[str, None] = "0003_pet_scans_result_hash"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = "uq_pet_kb_pet_disease"
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        inspector = sa.inspect(op.get_bind())
+        if not inspector.has_table("pet_kb"):
+            # Fresh database: the app creates pet_kb with the index
+            return
+        if INDEX in {index["name"] for index in inspector.get_indexes("pet_kb")}:
+            return
+    op.execute("""
+        DELETE FROM pet_kb
+        WHERE id NOT IN (SELECT max(id) FROM pet_kb GROUP BY pet_name, disease_name)
+    """)
+    op.create_index(INDEX, "pet_kb", ["pet_name", "disease_name"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX, table_name="pet_kb")
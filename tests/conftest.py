@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Settings are read at import time; give the app a throwaway configuration
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app.services.admission import BULK, INTERACTIVE, AdmissionController, AdmissionRejected
+
+
+def _controller(max_concurrency=2, interactive_reserved=1, max_queue=10, max_wait=0.05, bulk_rate=0.0):
+    return AdmissionController(
+        max_concurrency=max_concurrency,
+        interactive_reserved=interactive_reserved,
+        max_queue=max_queue,
+        max_wait={INTERACTIVE: max_wait, BULK: max_wait},
+        rates={INTERACTIVE: (0.0, 1), BULK: (bulk_rate, 1)},
+    )
+
+
+def test_bulk_never_takes_reserved_interactive_slots():
+    async def run():
+        controller = _controller()
+        bulk_at = await controller.acquire("a", BULK)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("b", BULK)
+        assert rejected.value.reason == "timeout"
+        interactive_at = await controller.acquire("c", INTERACTIVE)
+        assert controller.in_flight == 2
+        controller.release(BULK, bulk_at)
+        controller.release(INTERACTIVE, interactive_at)
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_freed_slot_goes_to_interactive_waiter_first():
+    async def run():
+        controller = _controller(max_concurrency=1, interactive_reserved=0, max_wait=5)
+        held = await controller.acquire("a", INTERACTIVE)
+        bulk = asyncio.create_task(controller.acquire("b", BULK))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(controller.acquire("c", INTERACTIVE))
+        await asyncio.sleep(0)
+        assert controller.queue_depth() == 2
+
+        controller.release(INTERACTIVE, held)
+        admitted_at = await interactive
+        assert not bulk.done()
+        controller.release(INTERACTIVE, admitted_at)
+        controller.release(BULK, await bulk)
+        assert controller.in_flight == 0 and controller.queue_depth() == 0
+
+    asyncio.run(run())
+
+
+def _handoff_at_timeout(monkeypatch, controller, holder_at, error):
+    """Make the queue wait end with `error` right after the holder hands its slot over."""
+    real_wait_for = asyncio.wait_for
+
+    async def wait_for(awaitable, timeout):
+        if not isinstance(awaitable, asyncio.Future):
+            return await real_wait_for(awaitable, timeout)
+        controller.release(INTERACTIVE, holder_at)
+        awaitable.cancel()  # the shield; the waiter itself now holds a slot
+        raise error
+
+    monkeypatch.setattr(asyncio, "wait_for", wait_for)
+
+
+def test_slot_handed_over_at_timeout_is_kept(monkeypatch):
+    async def run():
+        controller = _controller(max_concurrency=1, interactive_reserved=0)
+        held = await controller.acquire("a", INTERACTIVE)
+        _handoff_at_timeout(monkeypatch, controller, held, asyncio.TimeoutError())
+        admitted_at = await controller.acquire("b", INTERACTIVE)
+        assert controller.in_flight == 1 and controller.queue_depth() == 0
+        controller.release(INTERACTIVE, admitted_at)
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_slot_handed_over_to_cancelled_request_is_released(monkeypatch):
+    async def run():
+        controller = _controller(max_concurrency=1, interactive_reserved=0)
+        held = await controller.acquire("a", INTERACTIVE)
+        _handoff_at_timeout(monkeypatch, controller, held, asyncio.CancelledError())
+        with pytest.raises(asyncio.CancelledError):
+            await controller.acquire("b", INTERACTIVE)
+        assert controller.in_flight == 0 and controller.queue_depth() == 0
+
+    asyncio.run(run())
+
+
+def test_full_queue_and_rate_limit_reject():
+    async def run():
+        controller = _controller(max_concurrency=1, interactive_reserved=0, max_queue=1, max_wait=5, bulk_rate=0.001)
+        held = await controller.acquire("a", INTERACTIVE)
+        waiting = asyncio.create_task(controller.acquire("b", INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("c", INTERACTIVE)
+        assert rejected.value.reason == "queue_full"
+
+        controller.release(INTERACTIVE, held)
+        controller.release(INTERACTIVE, await waiting)
+        # Burst of 1 at a near-zero refill rate: the second bulk request is over its rate
+        controller.release(BULK, await controller.acquire("d", BULK))
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("d", BULK)
+        assert rejected.value.reason == "rate_limited"
+
+    asyncio.run(run())
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.config.settings import settings
+from app.models.idempotency import IdempotencyKey
+from app.services import idempotency
+from app.services.idempotency import IdempotencyError, IdempotencyService
+
+
+def _run(tmp_path, monkeypatch, scenario):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'idem.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(IdempotencyKey.__table__.create)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        monkeypatch.setattr(idempotency, "AsyncSessionLocal", sessions)
+        try:
+            return await scenario(sessions)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_claim_then_replay(tmp_path, monkeypatch):
+    async def scenario(sessions):
+        service = IdempotencyService()
+        claim = await service.begin("k", "fp")
+        assert claim.response is None
+        await service.complete(claim, {"scan_id": "s1"}, 200)
+        return await service.begin("k", "fp")
+
+    replay = _run(tmp_path, monkeypatch, scenario)
+    assert replay.response == {"scan_id": "s1"} and replay.status_code == 200
+
+
+def test_different_request_with_same_key_is_rejected(tmp_path, monkeypatch):
+    async def scenario(sessions):
+        service = IdempotencyService()
+        await service.begin("k", "fp")
+        with pytest.raises(IdempotencyError) as error:
+            await service.begin("k", "other")
+        return error.value.status_code
+
+    assert _run(tmp_path, monkeypatch, scenario) == 422
+
+
+def test_wait_for_other_worker_times_out(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_TIMEOUT", 0.2)
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL", 0.05)
+
+    async def scenario(sessions):
+        await IdempotencyService().begin("k", "fp")
+        # A second worker has no in-process event and polls the table
+        with pytest.raises(IdempotencyError) as error:
+            await IdempotencyService().begin("k", "fp")
+        return error.value.status_code
+
+    assert _run(tmp_path, monkeypatch, scenario) == 409
+
+
+def test_same_worker_retry_wakes_on_completion(tmp_path, monkeypatch):
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL", 60)
+
+    async def scenario(sessions):
+        service = IdempotencyService()
+        claim = await service.begin("k", "fp")
+        retry = asyncio.create_task(service.begin("k", "fp"))
+        await asyncio.sleep(0.05)
+        assert not retry.done()
+        started = time.monotonic()
+        await service.complete(claim, {"scan_id": "s1"})
+        replay = await retry
+        return replay, time.monotonic() - started
+
+    replay, waited = _run(tmp_path, monkeypatch, scenario)
+    assert replay.response == {"scan_id": "s1"}
+    assert waited < 1  # woken by the event, not the 60s poll
+
+
+def test_concurrent_claims_have_one_owner(tmp_path, monkeypatch):
+    monkeypatch.setattr(idempotency, "POLL_INTERVAL", 0.02)
+
+    async def scenario(sessions):
+        workers = [IdempotencyService() for _ in range(4)]
+        tasks = [asyncio.create_task(worker.begin("k", "fp")) for worker in workers]
+        await asyncio.sleep(0.1)
+        owners = [(worker, task.result()) for worker, task in zip(workers, tasks) if task.done()]
+        assert len(owners) == 1
+        owner, claim = owners[0]
+        assert claim.response is None
+        await owner.complete(claim, {"scan_id": "s1"})
+        return [await task for task in tasks]
+
+    claims = _run(tmp_path, monkeypatch, scenario)
+    assert sorted(str(claim.response) for claim in claims) == ["None"] + ["{'scan_id': 's1'}"] * 3
+
+
+def test_expired_and_released_keys_are_reclaimed(tmp_path, monkeypatch):
+    async def scenario(sessions):
+        async with sessions() as session:
+            # Owner died while in progress; its lock timed out
+            session.add(IdempotencyKey(
+                key="stale", fingerprint="fp", status="in_progress",
+                expires_at=datetime.utcnow() - timedelta(seconds=1),
+            ))
+            await session.commit()
+        service = IdempotencyService()
+        stale = await service.begin("stale", "fp")
+
+        failed = await service.begin("k", "fp")
+        await service.release(failed)
+        retried = await service.begin("k", "fp")
+        return stale, retried
+
+    stale, retried = _run(tmp_path, monkeypatch, scenario)
+    assert stale.response is None
+    assert retried.response is None
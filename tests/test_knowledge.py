@@ -0,0 +1,52 @@
+import asyncio
+import io
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models.pet_kb import PetKB
+from app.services.knowledge import KnowledgeBaseService
+
+CSV = "pet_name,disease_name,treatment\nDog,Mange,Shampoo\nCat,Ringworm,Antifungals\n"
+
+
+async def _import(tmp_path, duplicates: bool):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'kb.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE pet_kb (id INTEGER PRIMARY KEY, pet_name TEXT, disease_name TEXT, treatment TEXT)"
+        ))
+        if duplicates:
+            await conn.execute(text(
+                "INSERT INTO pet_kb (pet_name, disease_name, treatment) VALUES ('Dog', 'Mange', 'a'), ('Dog', 'Mange', 'b')"
+            ))
+    service = KnowledgeBaseService()
+    sessions = async_sessionmaker(engine)
+    try:
+        async with sessions() as session:
+            first = await service.import_stream(session, io.StringIO(CSV), "csv")
+        async with sessions() as session:
+            again = await service.import_stream(session, io.StringIO(CSV), "csv")
+            rows = (await session.execute(
+                select(PetKB.treatment).where(PetKB.pet_name == "Dog", PetKB.disease_name == "Mange")
+            )).scalars().all()
+            total = await session.scalar(select(func.count(PetKB.id)))
+        return service, first, again, rows, total
+    finally:
+        await engine.dispose()
+
+
+def test_import_counts_written_rows(tmp_path):
+    service, first, again, rows, total = asyncio.run(_import(tmp_path, duplicates=False))
+    assert service._unique_index is True
+    assert first == {"received": 2, "written": 2, "invalid": 0}
+    assert again["written"] == 0
+    assert rows == ["Shampoo"] and total == 2
+
+
+def test_import_falls_back_when_duplicates_block_the_index(tmp_path):
+    service, first, again, rows, total = asyncio.run(_import(tmp_path, duplicates=True))
+    assert service._unique_index is False
+    assert first["written"] == 2
+    assert again["written"] == 0
+    assert rows == ["Shampoo", "Shampoo"] and total == 3
@@ -0,0 +1,60 @@
+"""
+Partition maintenance needs PostgreSQL: set TEST_POSTGRES_URL to a throwaway
+database (postgresql+asyncpg://...). The tests drop and recreate pet_scans there.
+"""
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.services import partitions
+from app.services.partitions import add_months, month_start, partition_name
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+async def _ensure_with_rows_in_default(monkeypatch):
+    engine = create_async_engine(POSTGRES_URL)
+    monkeypatch.setattr(partitions, "engine", engine)
+    next_month = add_months(month_start(datetime.utcnow()), 1)
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP TABLE IF EXISTS pet_scans CASCADE"))
+            await conn.execute(text(
+                "CREATE TABLE pet_scans (id VARCHAR NOT NULL, created_at TIMESTAMP NOT NULL, "
+                "PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+            ))
+            await conn.execute(text("CREATE TABLE pet_scans_default PARTITION OF pet_scans DEFAULT"))
+            # Rows that landed in the default partition before next month's partition existed
+            await conn.execute(text(
+                "INSERT INTO pet_scans VALUES ('early', :at), ('later', :later)"
+            ), {"at": next_month.replace(day=2), "later": add_months(next_month, 5)})
+
+        created = await partitions.ensure_partitions(months_ahead=1)
+
+        async with engine.connect() as conn:
+            moved = (await conn.execute(text(f"SELECT id FROM {partition_name(next_month)}"))).scalars().all()
+            default = (await conn.execute(text("SELECT id FROM pet_scans_default"))).scalars().all()
+            total = await conn.scalar(text("SELECT count(*) FROM pet_scans"))
+            attached = await conn.scalar(text(
+                "SELECT count(*) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE c.relname = 'pet_scans_default'"
+            ))
+            await conn.execute(text("DROP TABLE pet_scans CASCADE"))
+            await conn.commit()
+        return next_month, created, moved, default, total, attached
+    finally:
+        await engine.dispose()
+
+
+def test_ensure_moves_rows_out_of_default_partition(monkeypatch):
+    next_month, created, moved, default, total, attached = asyncio.run(_ensure_with_rows_in_default(monkeypatch))
+    assert partition_name(next_month) in created
+    assert moved == ["early"]
+    assert default == ["later"]
+    assert total == 2
+    assert attached == 1
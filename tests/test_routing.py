@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.gemini import GeminiService
+from app.services.routing import ModelRouter
+
+
+def _router() -> ModelRouter:
+    return ModelRouter(["cheap", "heavy"], window_seconds=60, max_error_rate=0.5, max_p90_latency=20, min_samples=3)
+
+
+def _degrade(router: ModelRouter, model: str) -> None:
+    for _ in range(3):
+        router.record(model, 0.1, ok=False)
+
+
+def test_tiers_skip_degraded_models():
+    router = _router()
+    assert router.tiers() == ["cheap", "heavy"]
+    _degrade(router, "cheap")
+    assert router.tiers() == ["heavy"]
+
+
+def test_tiers_stay_cheap_to_heavy_when_all_degraded():
+    router = _router()
+    _degrade(router, "heavy")
+    _degrade(router, "cheap")
+    assert router.tiers() == ["cheap", "heavy"]
+
+
+def test_cascade_returns_heavy_answer_when_cheap_tier_is_degraded():
+    service = GeminiService()
+    service.router = _router()
+    _degrade(service.router, "cheap")
+    called = []
+
+    async def generate(prompt, image_data, *, model, **kwargs):
+        called.append(model)
+        return model
+
+    async def validate(text, *args):
+        return SimpleNamespace(model=text)
+
+    service._generate_with_retry = generate
+    service._validate_structured = validate
+    # The heavy answer still asks for escalation; it must not go back to the degraded cheap tier
+    result = asyncio.run(
+        service._generate_cascade("prompt", None, "qa", schema=None, assess=lambda answer: "unhealthy")
+    )
+    assert result.model == "heavy"
+    assert called == ["heavy"]
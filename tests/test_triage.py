@@ -0,0 +1,42 @@
+import pytest
+
+from app.models.triage_rule import TriageRule
+from app.services.triage import RuleSet, _AhoCorasickMatcher, _RegexMatcher
+
+
+def _ahocorasick(keywords):
+    pytest.importorskip("ahocorasick")
+    return _AhoCorasickMatcher(keywords)
+
+
+BACKENDS = [pytest.param(_RegexMatcher, id="regex"), pytest.param(_ahocorasick, id="ahocorasick")]
+KEYWORDS = sorted(["seizure", "seizure cluster", "bloat", "gastric bloat", "parvo"])
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_overlapping_keywords_all_match(backend):
+    matcher = backend(KEYWORDS)
+
+    assert matcher.find("seizure cluster and gastric bloat") == {"seizure", "seizure cluster", "bloat", "gastric bloat"}
+    assert matcher.find("seizure clusters | bloat") == {"seizure", "bloat"}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_whole_words_only(backend):
+    matcher = backend(KEYWORDS)
+
+    assert matcher.find("parvovirus | antibloat | seizures") == set()
+    assert matcher.find("parvo") == {"parvo"}
+    assert backend([]).find("parvo") == set()
+
+
+def test_rule_on_shorter_keyword_fires_inside_longer_one():
+    rules = [
+        TriageRule(name="seizure", keywords=["Seizure"], urgency="emergency", priority=10, reason="r", next_steps=[]),
+        TriageRule(name="cluster", keywords=["seizure cluster"], urgency="urgent", priority=90, reason="r", next_steps=[]),
+    ]
+
+    result = RuleSet(rules).evaluate("Epilepsy", ["seizure cluster"])
+
+    assert result.urgency == "emergency"
+    assert sorted(result.matched_rules) == ["cluster", "seizure"]